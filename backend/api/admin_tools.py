@@ -0,0 +1,99 @@
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .pagination import estimate_count
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списков админки для больших таблиц.
+
+    Для списка без фильтров число строк берётся из статистики PostgreSQL,
+    если таблица больше ADMIN_COUNT_ESTIMATE_THRESHOLD.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimated = estimate_count(self.object_list.model)
+            if (estimated is not None
+                    and estimated >= settings.ADMIN_COUNT_ESTIMATE_THRESHOLD):
+                return estimated
+        return super().count
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """
+    Фильтр списка по внешнему ключу с выбором через автодополнение.
+
+    В отличие от обычного фильтра не выводит в боковую панель все
+    связанные объекты, а ищет их через search_fields связанной админки.
+    """
+
+    template = 'admin/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = f'{self.field_name}__id__exact'
+        field = model._meta.get_field(self.field_name)
+        self.title = field.verbose_name
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        return ((None, None),)
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        if not value.isdigit():
+            return queryset.none()
+        return queryset.filter(**{f'{self.field_name}_id': value})
+
+    def choices(self, changelist):
+        yield {
+            'query_parts': [
+                (key, value)
+                for key, value in changelist.get_filters_params().items()
+                if key != self.parameter_name
+            ],
+        }
+
+    def widget(self):
+        return self.form_field.widget.render(
+            self.parameter_name, self.value(),
+            attrs={'onchange': 'this.form.submit()', 'style': 'width: 90%'},
+        )
+
+
+def autocomplete_filter(field_name):
+    """Класс фильтра с автодополнением для поля field_name."""
+    return type(
+        f'{field_name.title()}AutocompleteFilter',
+        (AutocompleteFilter,),
+        {'field_name': field_name},
+    )
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Базовая админка для больших таблиц: оценка числа строк вместо
+    COUNT(*) и скрипты автодополнения для фильтров.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(None, self.admin_site).media
@@ -0,0 +1,25 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import utils
+
+
+@contextmanager
+def test_database():
+    """
+    Отдельная тестовая база на время замера.
+
+    База создаётся миграциями, как при запуске тестов, и удаляется после
+    замера, поэтому синтетические данные и статистика ANALYZE не
+    попадают в рабочую базу.
+    """
+    utils.setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        utils.teardown_test_environment()
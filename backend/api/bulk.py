@@ -0,0 +1,171 @@
+from django.db import connection, transaction
+
+from recipes.models import Recipe, ShoppingCart, ShoppingListIngredient
+from users.models import User
+
+from .counters import RECIPE_COUNTERS, change_counters
+from .utils import total_amounts, update_shopping_lists
+
+ADDED = 'added'
+EXISTS = 'exists'
+REMOVED = 'removed'
+ABSENT = 'absent'
+NOT_FOUND = 'not_found'
+
+
+def columns(model):
+    """Имена таблицы и столбцов user / recipe, готовые для SQL."""
+    quote = connection.ops.quote_name
+    return (
+        quote(model._meta.db_table),
+        quote(model._meta.get_field('user').column),
+        quote(model._meta.get_field('recipe').column),
+    )
+
+
+def default_values(model):
+    """
+    Значения остальных столбцов новой строки, например auto_now_add.
+
+    Берутся так же, как при save(), чтобы вставка в обход ORM давала
+    те же строки.
+    """
+    instance = model()
+    return {
+        connection.ops.quote_name(field.column): field.get_db_prep_save(
+            field.pre_save(instance, True), connection
+        )
+        for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in ('user', 'recipe')
+    }
+
+
+def placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def insert_missing(model, user, recipe_ids):
+    """
+    Добавление строк одним INSERT ... ON CONFLICT DO NOTHING.
+
+    Возвращает id рецептов, строки которых действительно вставлены:
+    уже существующие строки и несуществующие рецепты пропускаются той же
+    командой, поэтому параллельные запросы не приводят к IntegrityError
+    и не считаются дважды. Синтаксис поддерживают PostgreSQL и SQLite.
+    """
+    if not recipe_ids:
+        return []
+    table, user_column, recipe_column = columns(model)
+    quote = connection.ops.quote_name
+    extra = default_values(model)
+    names = ''.join(f', {column}' for column in extra)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({user_column}, {recipe_column}{names}) '
+            f'SELECT %s, {quote("id")}{", %s" * len(extra)} '
+            f'FROM {quote(Recipe._meta.db_table)} '
+            f'WHERE {quote("id")} IN ({placeholders(recipe_ids)}) '
+            f'ON CONFLICT DO NOTHING RETURNING {recipe_column}',
+            [user.pk, *extra.values(), *recipe_ids],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def delete_existing(model, user, recipe_ids=None):
+    """
+    Удаление строк одним DELETE ... RETURNING.
+
+    Возвращает id рецептов действительно удалённых строк. Без recipe_ids
+    удаляются все строки пользователя.
+    """
+    table, user_column, recipe_column = columns(model)
+    sql = f'DELETE FROM {table} WHERE {user_column} = %s'
+    params = [user.pk]
+    if recipe_ids is not None:
+        if not recipe_ids:
+            return []
+        sql += f' AND {recipe_column} IN ({placeholders(recipe_ids)})'
+        params.extend(recipe_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(f'{sql} RETURNING {recipe_column}', params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def outcomes(recipe_ids, statuses, default):
+    """Результат по каждому id в порядке запроса."""
+    return [
+        {'id': recipe_id, 'status': statuses.get(recipe_id, default)}
+        for recipe_id in recipe_ids
+    ]
+
+
+@transaction.atomic
+def add_recipes(user, model, recipe_ids):
+    """
+    Добавление рецептов в избранное или корзину.
+
+    Возвращает id добавленных рецептов. Счётчики и список покупок
+    меняются только на действительно вставленные строки.
+    """
+    added = insert_missing(model, user, recipe_ids)
+    change_counters(Recipe, added, RECIPE_COUNTERS[model], 1)
+    if model is ShoppingCart and added:
+        update_shopping_lists([user.pk], total_amounts(added))
+    return added
+
+
+@transaction.atomic
+def remove_recipes(user, model, recipe_ids=None):
+    """Удаление рецептов из избранного или корзины одним DELETE."""
+    removed = delete_existing(model, user, recipe_ids)
+    change_counters(Recipe, removed, RECIPE_COUNTERS[model], -1)
+    if model is ShoppingCart and recipe_ids is None:
+        ShoppingListIngredient.objects.filter(user=user).delete()
+    elif model is ShoppingCart and removed:
+        update_shopping_lists([user.pk], total_amounts(removed, sign=-1))
+    return removed
+
+
+def bulk_add(user, model, recipe_ids):
+    """
+    Массовое добавление с результатом по каждому id.
+
+    Число запросов не зависит от числа рецептов: существующие рецепты
+    читаются одним запросом, строки вставляются одной командой.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    found = set(Recipe.objects.filter(
+        pk__in=recipe_ids
+    ).values_list('pk', flat=True))
+    statuses = dict.fromkeys(found, EXISTS)
+    statuses.update(dict.fromkeys(
+        add_recipes(user, model, recipe_ids), ADDED
+    ))
+    return outcomes(recipe_ids, statuses, NOT_FOUND)
+
+
+def bulk_remove(user, model, recipe_ids):
+    """Массовое удаление с результатом по каждому id."""
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    removed = remove_recipes(user, model, recipe_ids)
+    return outcomes(recipe_ids, dict.fromkeys(removed, REMOVED), ABSENT)
+
+
+def remove_marks(model, pairs):
+    """
+    Удаление строк избранного или корзины по парам (user_id, recipe_id).
+
+    Для удаления в обход API, например из админки: по одному
+    remove_recipes на пользователя, пользователи по возрастанию id.
+    """
+    recipe_ids = {}
+    for user_id, recipe_id in pairs:
+        recipe_ids.setdefault(user_id, []).append(recipe_id)
+    with transaction.atomic():
+        for user in User.objects.filter(pk__in=recipe_ids).order_by('pk'):
+            remove_recipes(user, model, recipe_ids[user.pk])
+
+
+def clear_cart(user):
+    """Очистка корзины и списка покупок. Возвращает id удалённых рецептов."""
+    return remove_recipes(user, ShoppingCart)
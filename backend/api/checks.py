@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Кэш default должен быть общим для процессов.
+
+    В нём хранится версия данных рецептов: её меняют и веб-процессы, и
+    обработчик задач, а по ней проверяются кэшированные ответы и ETag.
+    """
+    if settings.DEBUG:
+        return []
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+        return [Error(
+            "CACHES['default'] хранится в памяти процесса.",
+            hint='Задайте CACHE_BACKEND с общим хранилищем, например '
+                 'django.core.cache.backends.db.DatabaseCache.',
+            id='api.E001',
+        )]
+    return []
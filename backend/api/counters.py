@@ -0,0 +1,97 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import FavoriteReceipe, Recipe, ShoppingCart
+from users.models import Follow, User
+
+# Счётчик: (модель со счётчиком, поле, модель-источник, внешний ключ).
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteReceipe, 'recipe'),
+    (Recipe, 'carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+RECIPE_COUNTERS = {
+    FavoriteReceipe: 'favorites_count',
+    ShoppingCart: 'carts_count',
+}
+AUTHOR_COUNTERS = {
+    Recipe: 'recipes_count',
+    Follow: 'followers_count',
+}
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарное изменение счётчика одним UPDATE."""
+    return model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+@transaction.atomic
+def change_counters(model, pks, field, delta):
+    """
+    Одинаковое изменение счётчика у многих строк одним UPDATE.
+
+    Строки сначала блокируются по возрастанию ключа, поэтому
+    параллельные изменения пересекающихся наборов не блокируют друг
+    друга взаимно.
+    """
+    if not pks:
+        return 0
+    list(model.objects.select_for_update().filter(pk__in=pks).order_by(
+        'pk'
+    ).values_list('pk', flat=True))
+    return model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def actual_count(source, foreign_key):
+    """Подзапрос с фактическим числом связанных строк."""
+    return Coalesce(Subquery(
+        source.objects.filter(
+            **{foreign_key: OuterRef('pk')}
+        ).order_by().values(foreign_key).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), Value(0))
+
+
+def reconcile(model, batch_size=1000):
+    """
+    Исправление расхождений счётчиков модели пачками по первичному ключу.
+
+    Возвращает число исправленных строк.
+    """
+    counters = {
+        field: actual_count(source, foreign_key)
+        for counted, field, source, foreign_key in COUNTERS
+        if counted is model
+    }
+    drift = reduce(or_, (
+        ~Q(**{field: F(f'actual_{field}')}) for field in counters
+    ))
+    repaired = 0
+    last_pk = 0
+    while True:
+        batch = list(model.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return repaired
+        last_pk = batch[-1]
+        drifted = list(model.objects.filter(
+            pk__gte=batch[0], pk__lte=last_pk
+        ).annotate(**{
+            f'actual_{field}': expression
+            for field, expression in counters.items()
+        }).filter(drift).values_list('pk', flat=True))
+        if drifted:
+            repaired += model.objects.filter(pk__in=drifted).update(
+                **counters
+            )
@@ -0,0 +1,122 @@
+from django.conf import settings
+
+from recipes.models import FeedEntry, Recipe
+from tasks.queue import task
+from users.models import Follow, User
+
+FEED_BATCH_SIZE = 1000
+FEED_AUTHORS_BATCH_SIZE = 500
+
+
+def fans_out(author):
+    """Раздаются ли рецепты автора по лентам при публикации."""
+    return author.followers_count <= settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+@task()
+def fan_out_recipe(recipe_id):
+    """Добавление нового рецепта в ленты подписчиков автора пачками."""
+    recipe = Recipe.objects.filter(pk=recipe_id).select_related(
+        'author'
+    ).first()
+    if recipe is None or not fans_out(recipe.author):
+        return
+    followers = Follow.objects.filter(author_id=recipe.author_id).values_list(
+        'user_id', flat=True
+    ).iterator(chunk_size=FEED_BATCH_SIZE)
+    batch = []
+    for user_id in followers:
+        batch.append(FeedEntry(user_id=user_id, author_id=recipe.author_id,
+                               recipe_id=recipe.pk, pub_date=recipe.pub_date))
+        if len(batch) == FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill_feed(user, author):
+    """Последние рецепты автора в ленту нового подписчика."""
+    if not fans_out(author):
+        return
+    recipes = Recipe.objects.filter(author=author).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user=user, author=author, recipe_id=recipe_id,
+                   pub_date=pub_date) for recipe_id, pub_date in recipes],
+        ignore_conflicts=True,
+    )
+
+
+def latest_recipes(author_ids):
+    """Последние FEED_BACKFILL_SIZE рецептов каждого из авторов."""
+    latest = {author_id: [] for author_id in author_ids}
+    recipes = Recipe.objects.filter(author_id__in=author_ids).order_by(
+        'author_id', '-pub_date', '-pk'
+    ).values_list('author_id', 'pk', 'pub_date')
+    for author_id, recipe_id, pub_date in recipes.iterator(
+        chunk_size=FEED_BATCH_SIZE
+    ):
+        if len(latest[author_id]) < settings.FEED_BACKFILL_SIZE:
+            latest[author_id].append((recipe_id, pub_date))
+    return latest
+
+
+def backfill_feeds(author_ids):
+    """
+    Последние рецепты авторов в ленты всех их подписчиков.
+
+    Два запроса на пачку авторов и bulk_create пачками, число запросов
+    не зависит от числа подписок.
+    """
+    latest = latest_recipes(author_ids)
+    follows = Follow.objects.filter(author_id__in=author_ids).values_list(
+        'user_id', 'author_id'
+    )
+    batch = []
+    for user_id, author_id in follows.iterator(chunk_size=FEED_BATCH_SIZE):
+        batch.extend(
+            FeedEntry(user_id=user_id, author_id=author_id,
+                      recipe_id=recipe_id, pub_date=pub_date)
+            for recipe_id, pub_date in latest[author_id]
+        )
+        if len(batch) >= FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def rebuild_feeds():
+    """Заполнение лент по всем подпискам на авторов с раздачей."""
+    author_ids = list(User.objects.filter(
+        followers_count__gt=0,
+        followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(author_ids), FEED_AUTHORS_BATCH_SIZE):
+        backfill_feeds(author_ids[start:start + FEED_AUTHORS_BATCH_SIZE])
+
+
+def prune_feed(user, author):
+    """Удаление рецептов автора из ленты отписавшегося."""
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+def feed_sources(user):
+    """
+    Источники ключей (pub_date, id) ленты пользователя.
+
+    Основной источник — таблица ленты. Рецепты авторов с большим числом
+    подписчиков в ленты не раздаются и читаются из таблицы рецептов.
+    """
+    sources = [
+        (FeedEntry.objects.filter(user=user), ('pub_date', 'recipe_id')),
+    ]
+    large_authors = list(User.objects.filter(
+        following__user=user,
+        followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).values_list('pk', flat=True))
+    if large_authors:
+        sources.append((
+            Recipe.objects.filter(author__in=large_authors), ('pub_date', 'pk')
+        ))
+    return sources
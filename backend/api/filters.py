@@ -2,20 +2,49 @@ from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
 from recipes.models import Recipe, Tag
+from recipes.search import search_recipes
+
+from .tag_registry import tag_slug_choices
+
+RECIPE_ORDERINGS = {
+    'newest': ('-pub_date', '-pk'),
+    'popular': ('-favorites_count', '-pk'),
+}
+# Параметры, с которыми выдача зависит от счётчиков избранного: они
+# меняются без смены updated_at и версии рецептов. None — любое значение.
+COUNTER_PARAMS = {
+    'min_favorites': None,
+    'ordering': 'popular',
+}
+
+
+def depends_on_counters(params):
+    """Зависит ли выдача с параметрами params от счётчиков избранного."""
+    return any(
+        name in params and value in (None, params[name])
+        for name, value in COUNTER_PARAMS.items()
+    )
 
 
 class RecipeFilter(FilterSet):
     """Класс для фильтрации обьектов Recipes."""
 
-    tags = filters.ModelMultipleChoiceFilter(
+    tags = filters.MultipleChoiceFilter(
         field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+        choices=tag_slug_choices,
     )
     is_favorited = filters.BooleanFilter(method='is_favorited_filter')
     is_in_shopping_cart = filters.BooleanFilter(
         method='is_in_shopping_cart_filter'
     )
+    search = filters.CharFilter(method='search_filter')
+    min_favorites = filters.NumberFilter(
+        field_name='favorites_count', lookup_expr='gte'
+    )
+    ordering = filters.ChoiceFilter(
+        choices=[(key, key) for key in RECIPE_ORDERINGS],
+        method='ordering_filter',
+    )
 
     class Meta:
         model = Recipe
@@ -24,6 +53,9 @@ class RecipeFilter(FilterSet):
             'author',
             'is_favorited',
             'is_in_shopping_cart',
+            'search',
+            'min_favorites',
+            'ordering',
         )
 
     def is_favorited_filter(self, queryset, name, data):
@@ -38,6 +70,12 @@ class RecipeFilter(FilterSet):
             return queryset.filter(shopping_recipes__user=user)
         return queryset
 
+    def search_filter(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def ordering_filter(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
 
 class IngredientFilter(SearchFilter):
     """Класс для фильтрации обьектов Tags."""
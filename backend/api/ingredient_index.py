@@ -0,0 +1,85 @@
+from bisect import bisect_left, bisect_right
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+
+from recipes.models import Ingredient, normalize_name
+
+PREFIX_END = '\U0010ffff'
+SUBSTRING_MIN_LENGTH = 2
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для поиска по названию.
+
+    Отсортированный массив названий строится при первом запросе и
+    отвечает на поиск по префиксу двоичным поиском. Сначала выдаются
+    точные совпадения, затем совпадения по префиксу, затем по подстроке
+    (для запросов от SUBSTRING_MIN_LENGTH символов).
+    Индекс сбрасывается сигналами при изменении ингредиентов, а в других
+    процессах — по истечении INGREDIENT_INDEX_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._index = None
+        self._built_at = 0
+
+    def invalidate(self):
+        self._index = None
+
+    def _build(self):
+        rows = sorted(
+            (normalize_name(name), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ).order_by().iterator()
+        )
+        keys = [row[0] for row in rows]
+        items = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for _, pk, name, measurement_unit in rows
+        ]
+        # Все названия в одной строке: поиск подстроки выполняется
+        # str.find, а не перебором названий в цикле Python.
+        offsets = []
+        offset = 0
+        for key in keys:
+            offsets.append(offset)
+            offset += len(key) + 1
+        self._built_at = monotonic()
+        return keys, items, '\n'.join(keys), offsets
+
+    def _expired(self):
+        return monotonic() - self._built_at > settings.INGREDIENT_INDEX_TTL
+
+    def _get_index(self):
+        index = self._index
+        if index is None or self._expired():
+            with self._lock:
+                index = self._index
+                if index is None or self._expired():
+                    index = self._index = self._build()
+        return index
+
+    def search(self, query):
+        keys, items, text, offsets = self._get_index()
+        query = normalize_name(query)
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + PREFIX_END, start)
+        result = items[start:end]
+        position = -1
+        if len(query) >= SUBSTRING_MIN_LENGTH:
+            position = text.find(query)
+        while position != -1:
+            index = bisect_right(offsets, position) - 1
+            if offsets[index] != position:
+                result.append(items[index])
+            if index + 1 == len(offsets):
+                break
+            position = text.find(query, offsets[index + 1])
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,264 @@
+import json
+import random
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.benchmarks import test_database
+from api.serializers import RecipesReadSerializer, UserSerializer
+from api.views import RecipeViewSet
+from recipes.models import (FavoriteReceipe, Ingredient,
+                            IngredientInRecipesAmount, Recipe, ShoppingCart,
+                            ShoppingListIngredient, Tag)
+from users.models import Follow, User
+
+BASELINE = settings.BASE_DIR / 'benchmark_baseline.json'
+PREFIX = 'bench'
+TAGS = 6
+ENDPOINTS = (
+    ('recipes', '/api/recipes/?limit=20'),
+    ('recipes_by_tag', '/api/recipes/?limit=20&tags={tag}'),
+    ('recipes_favorited', '/api/recipes/?limit=20&is_favorited=1'),
+    ('recipe', '/api/recipes/{recipe}/'),
+    ('subscriptions', '/api/users/subscriptions/?limit=10&recipes_limit=3'),
+    ('download_shopping_cart', '/api/recipes/download_shopping_cart/'),
+)
+
+
+def seed(generator, users, recipes, ingredients, follows, marks):
+    """
+    Детерминированный набор данных: одинаковый при одинаковом --seed.
+
+    Строки перечитываются после bulk_create, потому что не все СУБД
+    возвращают первичные ключи.
+    """
+    User.objects.bulk_create(
+        User(username=f'{PREFIX}_{i}', email=f'{PREFIX}_{i}@foodgram.local',
+             first_name='Bench', last_name=str(i))
+        for i in range(users)
+    )
+    people = list(User.objects.filter(
+        username__startswith=f'{PREFIX}_'
+    ).order_by('pk'))
+    Tag.objects.bulk_create(
+        Tag(name=f'{PREFIX} {i}', color=f'#bec{i:03x}', slug=f'{PREFIX}-{i}')
+        for i in range(TAGS)
+    )
+    tags = list(Tag.objects.filter(
+        slug__startswith=f'{PREFIX}-'
+    ).order_by('pk'))
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'{PREFIX} ingredient {i}', measurement_unit='г')
+        for i in range(ingredients * 10)
+    )
+    products = list(Ingredient.objects.filter(
+        name__startswith=f'{PREFIX} ingredient '
+    ).order_by('pk'))
+    Recipe.objects.bulk_create(
+        Recipe(name=f'{PREFIX} recipe {i}', author=people[i % users],
+               text='Синтетический рецепт для замеров.',
+               cooking_time=generator.randint(5, 180),
+               image=f'recipes/{PREFIX}.png')
+        for i in range(recipes)
+    )
+    dishes = list(Recipe.objects.filter(
+        name__startswith=f'{PREFIX} recipe '
+    ).order_by('pk'))
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=dish, tag=tag)
+        for dish in dishes for tag in generator.sample(tags, 2)
+    )
+    amounts = {}
+    for dish in dishes:
+        for product in generator.sample(products, ingredients):
+            amounts[dish.pk, product.pk] = generator.randint(1, 500)
+    IngredientInRecipesAmount.objects.bulk_create(
+        IngredientInRecipesAmount(
+            recipe_id=recipe_id, ingredient_id=ingredient_id, amount=amount
+        )
+        for (recipe_id, ingredient_id), amount in amounts.items()
+    )
+    shopping_lists = {}
+    for person in people:
+        authors = generator.sample(
+            [author for author in people if author != person],
+            min(follows, users - 1),
+        )
+        Follow.objects.bulk_create(
+            Follow(user=person, author=author) for author in authors
+        )
+        chosen = generator.sample(dishes, min(marks, recipes))
+        FavoriteReceipe.objects.bulk_create(
+            FavoriteReceipe(user=person, recipe=dish) for dish in chosen
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=person, recipe=dish) for dish in chosen
+        )
+        chosen_ids = {dish.pk for dish in chosen}
+        for (recipe_id, ingredient_id), amount in amounts.items():
+            if recipe_id in chosen_ids:
+                key = person.pk, ingredient_id
+                shopping_lists[key] = shopping_lists.get(key, 0) + amount
+    ShoppingListIngredient.objects.bulk_create(
+        ShoppingListIngredient(
+            user_id=user_id, ingredient_id=ingredient_id, amount=amount
+        )
+        for (user_id, ingredient_id), amount in shopping_lists.items()
+    )
+    return people[0], tags[0], dishes[0]
+
+
+def run(func, repeat):
+    """Медиана и минимум времени func, число запросов одного вызова."""
+    func()
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = perf_counter()
+            func()
+            timings.append(perf_counter() - start)
+    return {
+        'median_ms': round(median(timings) * 1000, 3),
+        'min_ms': round(min(timings) * 1000, 3),
+        'queries': len(captured),
+    }
+
+
+def fetch(client, url):
+    def get():
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: ответ {response.status_code}.')
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+    return get
+
+
+def serialize(serializer_class, instances, request):
+    def build():
+        return serializer_class(
+            instances, many=True, context={'request': request}
+        ).data
+    return build
+
+
+def regressions(results, baseline, threshold, timings=True):
+    """Замеры, ухудшившиеся относительно базовых."""
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['queries'] > base['queries']:
+            yield (f'{name}: запросов {base["queries"]} → '
+                   f'{result["queries"]}')
+        if timings and (
+            result['median_ms'] > base['median_ms'] * (1 + threshold)
+        ):
+            yield (f'{name}: {base["median_ms"]} → '
+                   f'{result["median_ms"]} мс')
+
+
+class Command(BaseCommand):
+    """Выполнить команду python manage.py benchmark_endpoints."""
+
+    help = ('Замер основных эндпоинтов и сериализаторов на синтетических '
+            'данных с проверкой регрессий относительно сохранённых '
+            'замеров. Данные создаются в отдельной тестовой базе, которая '
+            'удаляется после замера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients', type=int, default=8,
+                            help='Ингредиентов в рецепте.')
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Подписок у пользователя.')
+        parser.add_argument('--marks', type=int, default=20,
+                            help='Рецептов в избранном и корзине.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--baseline', type=Path, default=BASELINE)
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help='Допустимый рост медианы, доля от базового замера.',
+        )
+        parser.add_argument(
+            '--queries-only', action='store_true',
+            help='Сравнивать только число запросов: время зависит от '
+                 'машины, на которой сохранены базовые замеры.',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Сохранить замеры как базовые вместо сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        with test_database():
+            start = perf_counter()
+            user, tag, recipe = seed(
+                random.Random(options['seed']), options['users'],
+                options['recipes'], options['ingredients'],
+                options['follows'], options['marks'],
+            )
+            self.stdout.write(
+                f'Данные созданы за {perf_counter() - start:.1f} сек.'
+            )
+            results = self.measure(user, tag, recipe, options['repeat'])
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name}: медиана {result["median_ms"]} мс, '
+                f'минимум {result["min_ms"]} мс, '
+                f'запросов {result["queries"]}'
+            )
+        path = options['baseline']
+        if options['save_baseline']:
+            path.write_text(
+                json.dumps(results, indent=2, sort_keys=True) + '\n'
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовые замеры сохранены в {path}.'
+            ))
+            return
+        if not path.exists():
+            self.stdout.write(self.style.WARNING(
+                f'Нет базовых замеров {path}: запустите с --save-baseline.'
+            ))
+            return
+        failed = list(regressions(
+            results, json.loads(path.read_text()), options['threshold'],
+            timings=not options['queries_only'],
+        ))
+        if failed:
+            raise CommandError(f'Регрессии: {"; ".join(failed)}.')
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def measure(self, user, tag, recipe, repeat):
+        client = APIClient()
+        client.force_authenticate(user)
+        results = {
+            name: run(fetch(client, url.format(
+                tag=tag.slug, recipe=recipe.pk
+            )), repeat)
+            for name, url in ENDPOINTS
+        }
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        view = RecipeViewSet(request=request, format_kwarg=None)
+        recipes = list(view.get_queryset().order_by('-pub_date')[:20])
+        authors = list(User.objects.filter(
+            username__startswith=f'{PREFIX}_'
+        ))
+        results['serializer_recipes'] = run(
+            serialize(RecipesReadSerializer, recipes, request), repeat
+        )
+        results['serializer_users'] = run(
+            serialize(UserSerializer, authors, request), repeat
+        )
+        return results
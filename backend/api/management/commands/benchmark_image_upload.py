@@ -0,0 +1,86 @@
+import base64
+import io
+import os
+import tracemalloc
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import BaseCommand
+from django.test import RequestFactory
+from PIL import Image
+from rest_framework.request import Request
+
+from api.parsers import MultiPartJSONParser
+from api.serializers import Base64ImageField
+
+SIZES = (5, 10, 20)
+MEGABYTE = 1024 * 1024
+
+
+def make_png(size):
+    """ PNG из шума без сжатия примерно заданного размера в байтах. """
+
+    side = int((size / 3) ** 0.5)
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', compress_level=0)
+    return buffer.getvalue()
+
+
+def peak_memory(function, *args):
+    """ Пиковый прирост памяти Python-кучи во время вызова, в МБ. """
+
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    if hasattr(result, 'close'):
+        result.close()
+    return peak / MEGABYTE
+
+
+def legacy_decode(data):
+    format, imgstr = data.split(';base64,')
+    ext = format.split('/')[-1]
+    return ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+
+
+def stream_decode(data):
+    return Base64ImageField().to_internal_value(data)
+
+
+def multipart_parse(request):
+    return Request(request, parsers=[MultiPartJSONParser()]).data['image']
+
+
+class Command(BaseCommand):
+    """Выполнить команду python manage.py benchmark_image_upload."""
+
+    help = ('Пиковая память при загрузке изображения рецепта: '
+            'base64 целиком, base64 по частям и multipart.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                            help='Размеры изображений в МБ.')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        for size in options['sizes']:
+            content = make_png(size * MEGABYTE)
+            data = 'data:image/png;base64,' + base64.b64encode(
+                content
+            ).decode()
+            request = factory.post('/api/recipes/', {
+                'image': SimpleUploadedFile('image.png', content),
+                'tags': '[1]',
+            })
+            self.stdout.write(
+                f'Изображение {len(content) / MEGABYTE:.1f} МБ '
+                f'(base64 {len(data) / MEGABYTE:.1f} МБ): '
+                f'base64 целиком {peak_memory(legacy_decode, data):.1f} МБ, '
+                f'base64 по частям {peak_memory(stream_decode, data):.1f} '
+                f'МБ, multipart {peak_memory(multipart_parse, request):.1f} '
+                f'МБ.'
+            )
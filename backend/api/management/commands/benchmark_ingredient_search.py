@@ -0,0 +1,59 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from api.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+PREFIX_LENGTHS = (1, 2, 3, 5)
+
+
+def measure(search, queries, repeat):
+    """ Среднее время одного поиска в микросекундах. """
+
+    start = perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            search(query)
+    return (perf_counter() - start) / (repeat * len(queries)) * 10 ** 6
+
+
+def orm_search(query):
+    return list(Ingredient.objects.filter(
+        name__istartswith=query
+    ).values('id', 'name', 'measurement_unit'))
+
+
+class Command(BaseCommand):
+    """Выполнить команду python manage.py benchmark_ingredient_search."""
+
+    help = ('Сравнение поиска ингредиентов по индексу в памяти '
+            'с поиском через ORM.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--sample', type=int, default=50)
+
+    def handle(self, *args, **options):
+        names = Ingredient.objects.order_by('id').values_list(
+            'name', flat=True
+        )[:options['sample']]
+        ingredient_index.invalidate()
+        start = perf_counter()
+        ingredient_index.search('')
+        self.stdout.write(
+            f'Построение индекса: {(perf_counter() - start) * 1000:.1f} мс.'
+        )
+        for length in PREFIX_LENGTHS:
+            queries = [name[:length] for name in names]
+            if not queries:
+                self.stdout.write(self.style.WARNING('Нет ингредиентов.'))
+                return
+            index_time = measure(ingredient_index.search, queries,
+                                 options['repeat'])
+            orm_time = measure(orm_search, queries, options['repeat'])
+            self.stdout.write(
+                f'Префикс {length} симв.: индекс {index_time:.1f} мкс, '
+                f'ORM {orm_time:.1f} мкс на запрос '
+                f'({orm_time / index_time:.0f}x).'
+            )
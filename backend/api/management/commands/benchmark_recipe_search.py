@@ -0,0 +1,91 @@
+import random
+from time import perf_counter
+
+from django.core.management import BaseCommand
+from django.db import connection
+
+from api.benchmarks import test_database
+from recipes.models import Ingredient, Recipe
+from recipes.search import (search_recipes, update_search_vectors,
+                            uses_postgresql)
+from users.models import User
+
+WORDS = (
+    'суп', 'борщ', 'салат', 'пирог', 'каша', 'запеканка', 'рагу', 'омлет',
+    'блины', 'котлеты', 'гуляш', 'плов', 'паста', 'соус', 'торт', 'кекс',
+    'курица', 'говядина', 'рыба', 'грибы', 'картофель', 'капуста', 'сыр',
+    'томаты', 'тыква', 'яблоки', 'творог', 'рис', 'гречка', 'фасоль',
+)
+QUERIES = ('борщ', 'пирог с яблоками', 'курица грибы', 'ваниль')
+TYPO_QUERIES = ('борш', 'запеконка')
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    """Выполнить команду python manage.py benchmark_recipe_search."""
+
+    help = ('Замер поиска рецептов на синтетической таблице с выводом '
+            'EXPLAIN ANALYZE. Данные создаются в отдельной тестовой '
+            'базе, которая удаляется после замера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def seed(self, count, seed):
+        generator = random.Random(seed)
+        vocabulary = sorted({
+            word for name in Ingredient.objects.values_list('name', flat=True)
+            for word in name.split() if len(word) > 3
+        }) or list(WORDS)
+        author = User.objects.create(
+            email='search-benchmark@foodgram.local',
+            username='search-benchmark',
+            first_name='Benchmark',
+        )
+        for start in range(0, count, BATCH_SIZE):
+            Recipe.objects.bulk_create(
+                Recipe(
+                    author=author,
+                    name=(
+                        f'{" ".join(generator.sample(WORDS, 2))} '
+                        f'{generator.choice(vocabulary)} №{number}'
+                    ),
+                    text=' '.join(generator.choices(vocabulary, k=30)),
+                    image='recipes/benchmark.png',
+                    cooking_time=generator.randint(5, 180),
+                )
+                for number in range(start, min(start + BATCH_SIZE, count))
+            )
+        update_search_vectors(
+            Recipe.objects.filter(author=author).values('pk')
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Recipe._meta.db_table}')
+
+    def report(self, query):
+        queryset = search_recipes(Recipe.objects.all(), query)[:10]
+        start = perf_counter()
+        list(queryset)
+        elapsed = (perf_counter() - start) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f'\n«{query}»: {elapsed:.1f} мс'
+        ))
+        self.stdout.write(queryset.explain(analyze=True))
+
+    def handle(self, *args, **options):
+        if not uses_postgresql():
+            self.stdout.write(self.style.WARNING(
+                'Замер требует PostgreSQL: GIN-индексы не используются '
+                'в других СУБД.'
+            ))
+            return
+        with test_database():
+            start = perf_counter()
+            self.seed(options['recipes'], options['seed'])
+            self.stdout.write(
+                f'Создано рецептов: {options["recipes"]} за '
+                f'{perf_counter() - start:.1f} сек.'
+            )
+            for query in QUERIES + TYPO_QUERIES:
+                self.report(query)
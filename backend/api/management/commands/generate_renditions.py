@@ -0,0 +1,31 @@
+from django.core.management import BaseCommand
+
+from api.renditions import generate_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Выполнить команду python manage.py generate_renditions."""
+
+    help = 'Построение недостающих вариантов картинок рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Перестроить варианты всех рецептов.')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only('id')
+        done = failed = 0
+        for recipe in recipes.iterator():
+            try:
+                generate_renditions(recipe.pk, options['force'])
+            except Exception as error:
+                failed += 1
+                self.stdout.write(self.style.WARNING(
+                    f'Рецепт {recipe.pk}: {error}.'
+                ))
+            else:
+                done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано рецептов: {done}, с ошибками: {failed}.'
+        ))
@@ -1,39 +1,111 @@
+import csv
 import datetime
 import json
+from itertools import islice
+from pathlib import Path
 
 from django.conf import settings
 from django.core.management import BaseCommand
 
-from recipes.models import Ingredient
+from recipes.models import Ingredient, normalize_name
 
 FILE = f'{settings.BASE_DIR}/data/ingredients.json'
+BATCH_SIZE = 5000
+READ_SIZE = 64 * 1024
+JSON_SEPARATORS = ' \t\r\n,['
 
 
-def import_json_data():
-    """ Обработка файла json. """
+def iter_json_rows(file):
+    """ Потоковое чтение массива объектов json без загрузки файла целиком. """
 
-    with open(FILE, 'r', encoding='utf-8') as file:
-        data = json.load(file)
-        for row in data:
-            Ingredient.objects.get_or_create(**row)
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    while True:
+        while (position < len(buffer)
+               and buffer[position] in JSON_SEPARATORS):
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        if position < len(buffer):
+            try:
+                row, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield row
+                continue
+        elif eof:
+            return
+        chunk = file.read(READ_SIZE)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def iter_csv_rows(file):
+    """ Потоковое чтение csv: название, единица измерения. """
+
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield {'name': row[0], 'measurement_unit': row[1]}
+
+
+def normalize(rows):
+    """ Приведение строк к виду, который даёт Ingredient.clean. """
+
+    for row in rows:
+        name = normalize_name(row.get('name', ''))
+        measurement_unit = normalize_name(row.get('measurement_unit', ''))
+        if name and measurement_unit:
+            yield name, measurement_unit
+
+
+def import_data(path, batch_size=BATCH_SIZE):
+    """ Загрузка ингредиентов пакетами, повторы пропускаются. """
+
+    reader = iter_csv_rows if Path(path).suffix == '.csv' else iter_json_rows
+    before = Ingredient.objects.count()
+    total = 0
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        rows = normalize(reader(file))
+        while True:
+            batch = set(islice(rows, batch_size))
+            if not batch:
+                break
+            total += len(batch)
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=measurement_unit)
+                 for name, measurement_unit in batch],
+                ignore_conflicts=True,
+            )
+    inserted = Ingredient.objects.count() - before
+    return inserted, total - inserted
 
 
 class Command(BaseCommand):
     """Выполнить команду python manage.py load_data."""
 
-    help = 'Импорт данных из файла ingredients.json'
+    help = ('Импорт ингредиентов из файлов json или csv '
+            '(по умолчанию data/ingredients.json)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', default=[FILE])
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
 
     def handle(self, *args, **options):
-        start_time = datetime.datetime.now()
-        try:
-            import_json_data()
-        except Exception as error:
-            self.stdout.write(
-                self.style.WARNING(f'Сбой в работе импорта: {error}.')
-            )
-        else:
+        for path in options['files']:
+            start_time = datetime.datetime.now()
+            try:
+                inserted, skipped = import_data(path, options['batch_size'])
+            except Exception as error:
+                self.stdout.write(
+                    self.style.WARNING(f'Сбой в работе импорта: {error}.')
+                )
+                continue
+            seconds = (datetime.datetime.now() - start_time).total_seconds()
+            rate = (inserted + skipped) / seconds if seconds else 0
             self.stdout.write(self.style.SUCCESS(
-                f'Загрузка данных завершена за '
-                f' {(datetime.datetime.now() - start_time).total_seconds()} '
-                f'сек.')
-            )
+                f'Загрузка {path} завершена за {seconds} сек.: '
+                f'добавлено {inserted}, пропущено {skipped} '
+                f'({rate:.0f} строк/сек).'
+            ))
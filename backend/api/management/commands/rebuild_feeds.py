@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from api.feed import rebuild_feeds
+from recipes.models import FeedEntry
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    """Выполнить команду python manage.py rebuild_feeds."""
+
+    help = 'Заполнение лент подписок по существующим подпискам.'
+
+    def handle(self, *args, **options):
+        rebuild_feeds()
+        self.stdout.write(self.style.SUCCESS(
+            f'Подписок: {Follow.objects.count()}, '
+            f'записей в лентах: {FeedEntry.objects.count()}.'
+        ))
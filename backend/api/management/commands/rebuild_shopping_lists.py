@@ -0,0 +1,89 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import IngredientInRecipesAmount, ShoppingListIngredient
+
+BATCH_SIZE = 5000
+
+
+def expected_amounts():
+    """ Суммы ингредиентов по корзинам, посчитанные заново. """
+
+    rows = IngredientInRecipesAmount.objects.filter(
+        recipe__shopping_recipes__isnull=False
+    ).values(
+        'recipe__shopping_recipes__user', 'ingredient'
+    ).annotate(total=Sum('amount')).order_by()
+    return {
+        (row['recipe__shopping_recipes__user'], row['ingredient']):
+            row['total']
+        for row in rows.iterator()
+    }
+
+
+def stored_amounts():
+    """ Суммы ингредиентов, сохранённые в списках покупок. """
+
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount
+        in ShoppingListIngredient.objects.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        ).iterator()
+    }
+
+
+class Command(BaseCommand):
+    """Выполнить команду python manage.py rebuild_shopping_lists."""
+
+    help = ('Проверка и пересборка списков покупок по корзинам. '
+            'С флагом --check только выводит расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить, не изменяя данные.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Размер пакета при записи.',
+        )
+
+    def handle(self, *args, **options):
+        expected = expected_amounts()
+        stored = stored_amounts()
+        missing = expected.keys() - stored.keys()
+        extra = stored.keys() - expected.keys()
+        wrong = [
+            key for key in expected.keys() & stored.keys()
+            if expected[key] != stored[key]
+        ]
+        self.stdout.write(
+            f'Строк: ожидается {len(expected)}, сохранено {len(stored)}. '
+            f'Отсутствует {len(missing)}, лишних {len(extra)}, '
+            f'с неверным количеством {len(wrong)}.'
+        )
+        if options['check']:
+            if missing or extra or wrong:
+                self.stdout.write(self.style.WARNING(
+                    'Списки покупок не согласованы с корзинами.'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    'Списки покупок согласованы с корзинами.'
+                ))
+            return
+        with transaction.atomic():
+            ShoppingListIngredient.objects.all().delete()
+            ShoppingListIngredient.objects.bulk_create(
+                (ShoppingListIngredient(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    amount=amount,
+                ) for (user_id, ingredient_id), amount in expected.items()),
+                batch_size=options['batch_size'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересобраны: {len(expected)} строк.'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management import BaseCommand
+
+from api.counters import reconcile
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Выполнить команду python manage.py reconcile_counters."""
+
+    help = ('Сверка счётчиков рецептов и пользователей с фактическими '
+            'данными и исправление расхождений.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model in (Recipe, User):
+            repaired = reconcile(model, options['batch_size'])
+            style = self.style.WARNING if repaired else self.style.SUCCESS
+            self.stdout.write(style(
+                f'{model._meta.verbose_name_plural}: '
+                f'исправлено {repaired}.'
+            ))
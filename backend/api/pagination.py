@@ -1,6 +1,264 @@
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .versions import get_recipes_version
 
 
 class LimitPaginator(PageNumberPagination):
-    """Класс пагинации страниц."""
+    """Класс пагинации страниц.
+
+    С параметром cursor (пустым для первой страницы) включается
+    постраничный вывод по ключу: следующая страница выбирается условием
+    на поля cursor_ordering вьюсета (по умолчанию -pk), без OFFSET и без
+    подсчёта общего числа объектов.
+    """
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    cursor_page_size = 6
+    default_cursor_ordering = ('-pk',)
+
+    def is_cursor_request(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.is_cursor_request(request)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        ordering = getattr(
+            view, 'cursor_ordering', self.default_cursor_ordering
+        )
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.descending = ordering[0].startswith('-')
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position))
+        page_size = self.get_page_size(request) or self.cursor_page_size
+        page = list(queryset.order_by(*ordering)[:page_size + 1])
+        self.has_next = len(page) > page_size
+        self.page = page[:page_size]
+        return self.page
+
+    def position_filter(self, position):
+        """Условие «после position» в лексикографическом порядке полей."""
+        lookup = 'lt' if self.descending else 'gt'
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            equal = {name: value for name, value
+                     in zip(self.fields[:index], position[:index])}
+            condition |= Q(**equal, **{f'{field}__{lookup}': position[index]})
+        # Условие на первое поле дублируется отдельно, чтобы стать
+        # границей диапазона индекса, а не фильтром по строкам.
+        return Q(**{f'{self.fields[0]}__{lookup}e': position[0]}) & condition
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [
+                model._meta.get_field(field).to_python(value)
+                if field != 'pk' else model._meta.pk.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise NotFound('Неверный курсор.')
+
+    def encode_cursor(self, instance):
+        values = [getattr(instance, field) for field in self.fields]
+        return urlsafe_b64encode(json.dumps(
+            [value.isoformat() if hasattr(value, 'isoformat') else value
+             for value in values]
+        ).encode()).decode()
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict((
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        )))
+
+
+class FeedPaginator(LimitPaginator):
+    """Пагинация ленты подписок по ключу (pub_date, id).
+
+    Ключи страницы собираются из нескольких источников, каждый читается
+    одним диапазоном индекса, затем рецепты страницы загружаются по id.
+    """
+
+    def paginate_sources(self, sources, queryset, request):
+        self.cursor_mode = True
+        self.request = request
+        self.descending = True
+        self.fields = ['pub_date', 'pk']
+        position = self.decode_cursor(request, queryset.model)
+        page_size = self.get_page_size(request) or self.cursor_page_size
+        keys = set()
+        for source, fields in sources:
+            self.fields = fields
+            if position is not None:
+                source = source.filter(self.position_filter(position))
+            keys.update(source.order_by(
+                *(f'-{field}' for field in fields)
+            ).values_list(*fields)[:page_size + 1])
+        self.fields = ['pub_date', 'pk']
+        keys = sorted(keys, reverse=True)
+        self.has_next = len(keys) > page_size
+        self.page = list(queryset.filter(
+            pk__in=[pk for _, pk in keys[:page_size]]
+        ).order_by('-pub_date', '-pk'))
+        return self.page
+
+
+class CountedPaginator(Paginator):
+    """Paginator Django с заранее известным числом объектов."""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+
+class ProbedPage(Page):
+    """Страница, наличие следующей у которой проверено запросом."""
+
+    def __init__(self, object_list, number, paginator, next_exists):
+        super().__init__(object_list, number, paginator)
+        self.next_exists = next_exists
+
+    def has_next(self):
+        return self.next_exists
+
+
+class EstimatedPaginator(CountedPaginator):
+    """Paginator Django с оценкой числа объектов.
+
+    Оценка идёт только в поле count ответа. Страница читается с одним
+    лишним объектом, по которому видно, есть ли следующая, поэтому
+    переход по страницам не зависит от точности оценки.
+    """
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return super().validate_number(number)
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1.')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage('На этой странице нет результатов.')
+        return ProbedPage(
+            objects[:self.per_page], number, self,
+            len(objects) > self.per_page,
+        )
+
+
+def estimate_count(model):
+    """Оценка числа строк таблицы по статистике планировщика PostgreSQL."""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class RecipePaginator(LimitPaginator):
+    """Пагинация рецептов с дешёвым подсчётом числа объектов.
+
+    Для списка без фильтров по большой таблице отдаётся оценка
+    планировщика, а страницы выбираются без опоры на неё. Точное число
+    для выборки с фильтрами кэшируется по параметрам запроса и версии
+    данных рецептов. Фильтры по избранному и корзине зависят от
+    пользователя и всегда считаются точно. Признак оценки возвращается
+    в поле count_estimated.
+    """
+
+    user_filters = ('is_favorited', 'is_in_shopping_cart')
+    ignored_params = ('page', 'limit', 'cursor', 'format')
+
+    def get_count(self, queryset, request):
+        """Число объектов и признак того, что это оценка."""
+        if getattr(self, 'count_info', None) is not None:
+            return self.count_info
+        params = sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+            if key not in self.ignored_params and any(values)
+        )
+        estimated = None
+        if not params:
+            estimated = estimate_count(queryset.model)
+        if (estimated is not None
+                and estimated >= settings.RECIPES_COUNT_ESTIMATE_THRESHOLD):
+            self.count_info = (estimated, True)
+        elif any(key in self.user_filters for key, _ in params):
+            self.count_info = (queryset.count(), False)
+        else:
+            key = 'recipes:count:{}:{}'.format(
+                get_recipes_version(),
+                hashlib.md5(json.dumps(params).encode()).hexdigest(),
+            )
+            count = cache.get(key)
+            if count is None:
+                count = queryset.count()
+                cache.set(key, count, settings.RECIPES_COUNT_CACHE_TIMEOUT)
+            self.count_info = (count, False)
+        return self.count_info
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_cursor_request(request):
+            count, self.count_estimated = self.get_count(queryset, request)
+            self.django_paginator_class = partial(
+                EstimatedPaginator if self.count_estimated
+                else CountedPaginator,
+                count=count,
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if not self.cursor_mode:
+            response.data['count_estimated'] = self.count_estimated
+        return response
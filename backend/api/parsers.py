@@ -0,0 +1,54 @@
+import json
+
+from rest_framework.fields import ListField
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+from rest_framework.relations import ManyRelatedField
+from rest_framework.serializers import ListSerializer
+
+LIST_FIELDS = (ListField, ListSerializer, ManyRelatedField)
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """
+    Разбор multipart/form-data для записи рецептов.
+
+    Файлы пишутся обработчиками загрузки Django во временные файлы,
+    а вложенные поля (ingredients, tags) передаются строками json.
+    Поля-списки сериализатора представления всегда остаются списками:
+    их можно передать повторяющимся полем, в том числе одним значением,
+    или одной строкой json.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        result = super().parse(stream, media_type, parser_context)
+        list_fields = self.list_fields(parser_context)
+        data = {}
+        for key, values in result.data.lists():
+            values = [self.decode(value) for value in values]
+            if key not in list_fields:
+                data[key] = values[-1]
+            elif len(values) == 1 and isinstance(values[0], list):
+                data[key] = values[0]
+            else:
+                data[key] = values
+        return DataAndFiles(data, result.files.dict())
+
+    @staticmethod
+    def list_fields(parser_context):
+        """Имена полей-списков сериализатора представления."""
+        view = (parser_context or {}).get('view')
+        if view is None:
+            return set()
+        return {
+            name for name, field in view.get_serializer().fields.items()
+            if isinstance(field, LIST_FIELDS)
+        }
+
+    @staticmethod
+    def decode(value):
+        if value[:1] not in ('[', '{'):
+            return value
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
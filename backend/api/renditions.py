@@ -0,0 +1,109 @@
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+from tasks.queue import task
+
+from .versions import bump_recipes_version
+
+RENDITIONS_DIR = 'recipes/renditions'
+RENDITION_SIZES = {
+    'thumbnail': (240, 240),
+    'medium': (640, 640),
+}
+RENDITION_FORMATS = {
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+SOURCE_KEY = 'source'
+
+
+def rendition_names():
+    """Имена всех вариантов картинки: thumbnail, thumbnail_webp и т.д."""
+    return [
+        size if extension == 'jpeg' else f'{size}_{extension}'
+        for size in RENDITION_SIZES for extension in RENDITION_FORMATS
+    ]
+
+
+def render(image):
+    """Варианты картинки в памяти: {имя: (расширение, содержимое)}."""
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    result = {}
+    for size, box in RENDITION_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail(box, Image.LANCZOS)
+        for extension, options in RENDITION_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, **options)
+            name = size if extension == 'jpeg' else f'{size}_{extension}'
+            result[name] = (extension, buffer.getvalue())
+    return result
+
+
+@task(queue='renditions')
+def delete_renditions(renditions):
+    """Удаление файлов вариантов из хранилища."""
+    for name, path in renditions.items():
+        if name != SOURCE_KEY and default_storage.exists(path):
+            default_storage.delete(path)
+
+
+@task(queue='renditions', timeout=120)
+def generate_renditions(recipe_id, force=False):
+    """
+    Построение вариантов картинки рецепта.
+
+    Результат записывается, только если картинка не сменилась за время
+    работы; варианты прежней картинки удаляются.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'renditions'
+    ).first()
+    if recipe is None or not recipe.image:
+        return
+    source = recipe.image.name
+    if not force and recipe.renditions.get(SOURCE_KEY) == source:
+        return
+    with recipe.image.open('rb') as file, Image.open(file) as image:
+        rendered = render(image)
+    stem = PurePosixPath(source).stem
+    renditions = {SOURCE_KEY: source}
+    for name, (extension, content) in rendered.items():
+        renditions[name] = default_storage.save(
+            f'{RENDITIONS_DIR}/{stem}_{name}.{extension}',
+            ContentFile(content),
+        )
+    if not Recipe.objects.filter(pk=recipe_id, image=source).update(
+        renditions=renditions, updated_at=timezone.now()
+    ):
+        delete_renditions(renditions)
+        return
+    delete_renditions(recipe.renditions)
+    bump_recipes_version()
+
+
+def rendition_urls(recipe, request=None):
+    """
+    Ссылки на варианты картинки рецепта.
+
+    Пока варианты не построены, вместо них отдаётся исходная картинка.
+    """
+    if not recipe.image:
+        return None
+    renditions = recipe.renditions
+    if renditions.get(SOURCE_KEY) != recipe.image.name:
+        renditions = dict.fromkeys(rendition_names(), recipe.image.name)
+    urls = {
+        name: default_storage.url(renditions[name])
+        for name in rendition_names()
+    }
+    if request is None:
+        return urls
+    return {name: request.build_absolute_uri(url)
+            for name, url in urls.items()}
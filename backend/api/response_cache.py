@@ -0,0 +1,76 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from .filters import depends_on_counters
+from .utils import set_validators
+from .versions import get_recipes_version
+
+
+def is_cacheable(request):
+    """
+    Кэшируются только GET-запросы анонимных пользователей.
+
+    Выдача, зависящая от счётчиков избранного, не кэшируется: они
+    меняются без смены версии рецептов.
+    """
+    if request.method != 'GET' or request.user.is_authenticated:
+        return False
+    return not depends_on_counters(request.query_params)
+
+
+def response_key(request):
+    """
+    Ключ ответа: адрес, нормализованные параметры и версия рецептов.
+
+    Смена версии сигналами делает недоступными сразу все старые ответы,
+    поэтому инвалидация не зависит от их числа.
+    """
+    params = sorted(
+        (key, sorted(values))
+        for key, values in request.query_params.lists()
+        if any(values)
+    )
+    raw = json.dumps([request.build_absolute_uri(request.path), params])
+    return 'recipes:response:{}:{}'.format(
+        get_recipes_version(), hashlib.md5(raw.encode()).hexdigest()
+    )
+
+
+def cached_response(request, build):
+    """
+    Ответ из кэша RECIPES_RESPONSE_CACHE или построенный функцией build.
+
+    В кэше хранятся данные ответа и его валидаторы, так что повторный
+    запрос читает только версию рецептов и по-прежнему может получить 304.
+    """
+    if not is_cacheable(request):
+        return build()
+    cache = caches[settings.RECIPES_RESPONSE_CACHE]
+    key = response_key(request)
+    entry = cache.get(key)
+    if entry is None:
+        response = build()
+        if response.status_code == 200:
+            cache.set(key, {
+                'data': response.data,
+                'etag': response.get('ETag'),
+                'last_modified': parse_http_date_safe(
+                    response.get('Last-Modified')
+                ),
+            })
+        return response
+    etag, last_modified = entry['etag'], entry['last_modified']
+    if etag is None:
+        return Response(entry['data'])
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = Response(entry['data'])
+    return set_validators(response, etag, last_modified)
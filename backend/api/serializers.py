@@ -1,14 +1,23 @@
 import base64
-
-from django.core.files.base import ContentFile
-from rest_framework.serializers import (CharField, ImageField, ModelSerializer,
+import binascii
+import re
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
+from rest_framework.serializers import (CharField, ImageField, IntegerField,
+                                        ListField, ModelSerializer,
                                         PrimaryKeyRelatedField, ReadOnlyField,
-                                        SerializerMethodField, ValidationError)
+                                        Serializer, SerializerMethodField,
+                                        ValidationError)
 
 from foodgram.settings import ZERO_MIN_VALUE
 from recipes.models import Ingredient, IngredientInRecipesAmount, Recipe, Tag
 from users.models import Follow, User
 
+from .renditions import rendition_urls
+from .utils import get_subscriptions, update_shopping_lists
+
 
 class IngredientSerializer(ModelSerializer):
     """Сериализатор объектов типа Ingredients. Список ингредиентов."""
@@ -37,16 +46,82 @@ class IngredientsInRecipeReadSerializer(ModelSerializer):
         )
 
 
+BASE64_PREFIX = ';base64,'
+BASE64_CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r'\s')
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+
+def image_extension(head):
+    """Формат изображения по первым байтам файла."""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
 class Base64ImageField(ImageField):
-    """Сериализатор картинок в рецептах."""
+    """
+    Сериализатор картинок в рецептах.
+
+    Принимает файл из multipart/form-data или строку data:image;base64.
+    Строка декодируется частями во временный файл на диске, поэтому ни
+    проверка Pillow, ни сохранение не держат картинку в памяти целиком.
+    Размер проверяется до декодирования, формат — по первой части.
+    """
+
+    default_error_messages = {
+        'too_large': 'Размер изображения превышает {max_size} байт.',
+        'invalid_base64': 'Некорректная строка base64.',
+    }
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode(data)
+        elif getattr(data, 'size', 0) > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
         return super().to_internal_value(data)
 
+    def decode(self, data):
+        start = data.find(BASE64_PREFIX) + len(BASE64_PREFIX)
+        if start < len(BASE64_PREFIX):
+            self.fail('invalid_base64')
+        # Переносы строк допустимы в base64, но сдвигают границы частей,
+        # поэтому убираются; строка без них не копируется.
+        if WHITESPACE.search(data, start):
+            data, start = ''.join(data[start:].split()), 0
+        if start == len(data):
+            self.fail('invalid_base64')
+        if (len(data) - start) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+        file = TemporaryUploadedFile('temp', None, 0, None)
+        try:
+            for position in range(start, len(data), BASE64_CHUNK_SIZE):
+                chunk = base64.b64decode(
+                    data[position:position + BASE64_CHUNK_SIZE], validate=True
+                )
+                if position == start:
+                    extension = image_extension(chunk)
+                    if extension is None:
+                        file.close()
+                        self.fail('invalid_image')
+                file.write(chunk)
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid_base64')
+        file.name = f'temp.{extension}'
+        file.content_type = f'image/{extension}'
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
 
 class TagSerializer(ModelSerializer):
     """Сериализация объектов типа Tags. Список тегов."""
@@ -77,12 +152,15 @@ class UserSerializer(ModelSerializer):
             'is_subscribed',
         )
 
+    def to_representation(self, instance):
+        # Автор нескольких рецептов на странице сериализуется один раз.
+        cache = self.context.setdefault('users_cache', {})
+        if instance.pk not in cache:
+            cache[instance.pk] = super().to_representation(instance)
+        return cache[instance.pk]
+
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        return bool(
-            user and not user.is_anonymous
-            and user.follower.filter(author=obj).exists()
-        )
+        return obj.pk in get_subscriptions(self.context.get('request'))
 
 
 class UserCreateSerializer(ModelSerializer):
@@ -99,6 +177,7 @@ class ShoppingListFavoiriteSerializer(ModelSerializer):
     """Сериализация объектов типа shoppingLists. Лист покупок."""
 
     image = Base64ImageField(read_only=True)
+    renditions = SerializerMethodField()
     name = ReadOnlyField()
     cooking_time = ReadOnlyField()
 
@@ -108,9 +187,13 @@ class ShoppingListFavoiriteSerializer(ModelSerializer):
             'id',
             'name',
             'image',
+            'renditions',
             'cooking_time',
         )
 
+    def get_renditions(self, obj):
+        return rendition_urls(obj, self.context.get('request'))
+
 
 class FollowSerializer(ModelSerializer):
     """Сериализация объектов типа Follow. Проверка подписки."""
@@ -138,7 +221,8 @@ class FollowSerializer(ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(user=obj.user, author=obj.author).exists()
+        # Объект подписки сам по себе означает, что подписка существует.
+        return obj.pk is not None
 
     def validate(self, data):
         author = self.instance
@@ -154,9 +238,13 @@ class FollowSerializer(ModelSerializer):
         return data
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
+        return obj.author.recipes_count
 
     def get_recipes(self, obj):
+        if hasattr(obj.author, 'recipes_preview'):
+            return ShoppingListFavoiriteSerializer(
+                obj.author.recipes_preview, many=True
+            ).data
         request = self.context.get('request')
         query_params = request.query_params
         queryset = Recipe.objects.filter(author=obj.author)
@@ -167,9 +255,37 @@ class FollowSerializer(ModelSerializer):
         return serializer.data
 
 
+class BulkPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    Первичный ключ без отдельного запроса на каждое значение.
+
+    Поле проверяет только тип, объекты подставляются в validate
+    сериализатора одним запросом in_bulk на все значения.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+def resolve_pks(queryset, pks, field, label):
+    """Объекты по списку ключей одним запросом; ошибка со всеми лишними."""
+    objects = queryset.in_bulk(pks)
+    unknown = sorted(set(pks) - objects.keys())
+    if unknown:
+        raise ValidationError({
+            field: f'{label} не найдены: {", ".join(map(str, unknown))}'
+        })
+    return objects
+
+
 class IngredientsInRecipeWriteSerializer(ModelSerializer):
     """Сериализатор добавления ингредиента в рецепт."""
-    id = PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = BulkPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
 
     class Meta:
         model = IngredientInRecipesAmount
@@ -194,6 +310,7 @@ class RecipesReadSerializer(ModelSerializer):
         read_only=True
     )
     image = Base64ImageField()
+    renditions = SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -204,18 +321,26 @@ class RecipesReadSerializer(ModelSerializer):
             'ingredients',
             'name',
             'image',
+            'renditions',
             'text',
             'cooking_time',
             'is_favorited',
             'is_in_shopping_cart',
         )
 
+    def get_renditions(self, obj):
+        return rendition_urls(obj, self.context.get('request'))
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         return (user.is_authenticated
                 and obj.favorite_recipes.filter(user=user).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         return (user.is_authenticated
                 and obj.shopping_recipes.filter(user=user).exists())
@@ -224,7 +349,7 @@ class RecipesReadSerializer(ModelSerializer):
 class RecipesWriteSerializer(ModelSerializer):
     """Сериализация объектов типа Recipes. Запись рецептов."""
 
-    tags = PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    tags = BulkPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
     ingredients = IngredientsInRecipeWriteSerializer(many=True,
                                                      source='recipe')
     image = Base64ImageField()
@@ -245,11 +370,15 @@ class RecipesWriteSerializer(ModelSerializer):
         read_only_fields = ('author',)
 
     def validate(self, data):
-        """Валидация ингредиентов при заполнении рецепта."""
+        """
+        Валидация ингредиентов при заполнении рецепта.
+
+        Ингредиенты и теги читаются одним запросом каждые, так что число
+        запросов не зависит от размера рецепта.
+        """
         ingredients = data['recipe']
         tags = data['tags']
         cooking_time = data['cooking_time']
-        ingredients_list = []
         name = data.get('name')
         if not ingredients:
             raise ValidationError({
@@ -259,13 +388,12 @@ class RecipesWriteSerializer(ModelSerializer):
             raise ValidationError({
                 'Укажите тэг!'
             })
+        ingredient_ids = [ingredient['id'] for ingredient in ingredients]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise ValidationError({
+                'Ингредиенты должны быть уникальными'
+            })
         for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            if ingredient_id in ingredients_list:
-                raise ValidationError({
-                    'Ингредиенты должны быть уникальными'
-                })
-            ingredients_list.append(ingredient_id)
             amount = ingredient['amount']
             if int(amount) == ZERO_MIN_VALUE:
                 raise ValidationError({
@@ -275,6 +403,7 @@ class RecipesWriteSerializer(ModelSerializer):
             raise ValidationError({
                 'Время приготовления не может быть = 0!'
             })
+        self.resolve_relations(data)
         if name:
             existing_recipes = Recipe.objects.filter(name=name)
             if self.instance:
@@ -287,6 +416,20 @@ class RecipesWriteSerializer(ModelSerializer):
                 )
         return data
 
+    def resolve_relations(self, data):
+        """Замена ключей ингредиентов и тегов объектами из базы."""
+        ingredients = data['recipe']
+        known_ingredients = resolve_pks(
+            Ingredient.objects.all(),
+            [ingredient['id'] for ingredient in ingredients],
+            'ingredients', 'Ингредиенты',
+        )
+        for ingredient in ingredients:
+            ingredient['id'] = known_ingredients[ingredient['id']]
+        tag_ids = list(dict.fromkeys(data['tags']))
+        known_tags = resolve_pks(Tag.objects.all(), tag_ids, 'tags', 'Теги')
+        data['tags'] = [known_tags[tag_id] for tag_id in tag_ids]
+
     def validate_name(self, value):
         if len(value) > 200:
             raise ValidationError({
@@ -294,6 +437,15 @@ class RecipesWriteSerializer(ModelSerializer):
             })
         return value
 
+    def save(self, **kwargs):
+        """Временный файл картинки закрывается сразу после сохранения."""
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get('image')
+            if image is not None:
+                image.close()
+
     def create_update_ingredient(self, ingredients, recipe):
         IngredientInRecipesAmount.objects.bulk_create(
             [IngredientInRecipesAmount(
@@ -307,21 +459,81 @@ class RecipesWriteSerializer(ModelSerializer):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('recipe')
         user = self.context.get('request').user
-        recipe = Recipe.objects.create(author=user, **validated_data)
-        recipe.tags.set(tags)
-        self.create_update_ingredient(ingredients, recipe)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(author=user, **validated_data)
+            recipe.tags.set(tags)
+            self.create_update_ingredient(ingredients, recipe)
         return recipe
 
+    def update_ingredients(self, instance, ingredients):
+        """
+        Изменение ингредиентов рецепта по разнице со старым составом.
+
+        Добавляются только новые строки, удаляются только исключённые,
+        изменённые количества обновляются одним запросом. Возвращает
+        изменения количеств для списков покупок.
+        """
+        rows = {
+            row.ingredient_id: row
+            for row in IngredientInRecipesAmount.objects.filter(
+                recipe=instance
+            )
+        }
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        deltas = {
+            ingredient_id: -row.amount for ingredient_id, row in rows.items()
+        }
+        for ingredient_id, amount in amounts.items():
+            deltas[ingredient_id] = deltas.get(ingredient_id, 0) + amount
+        removed = rows.keys() - amounts.keys()
+        if removed:
+            IngredientInRecipesAmount.objects.filter(
+                recipe=instance, ingredient_id__in=removed
+            ).delete()
+        IngredientInRecipesAmount.objects.bulk_create(
+            IngredientInRecipesAmount(
+                recipe=instance, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in rows
+        )
+        changed = []
+        for ingredient_id, row in rows.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != row.amount:
+                row.amount = amount
+                changed.append(row)
+        IngredientInRecipesAmount.objects.bulk_update(changed, ('amount',))
+        return deltas
+
     def update(self, instance, validated_data):
         request = self.context.get('request')
         if request.user.is_authenticated and \
                 request.user.id == instance.author_id:
             tags = validated_data.pop('tags')
-            instance.tags.clear()
-            instance.tags.set(tags)
             ingredients = validated_data.pop('recipe')
-            instance.ingredients.clear()
-            self.create_update_ingredient(ingredients, instance)
-            return super().update(instance, validated_data)
+            with transaction.atomic():
+                instance.tags.set(tags)
+                deltas = self.update_ingredients(instance, ingredients)
+                update_shopping_lists(
+                    list(instance.shopping_recipes.values_list(
+                        'user_id', flat=True
+                    )),
+                    deltas,
+                )
+                return super().update(instance, validated_data)
         else:
             raise ValidationError('Вы не можете редактировать этот рецепт')
+
+
+class RecipeIdsSerializer(Serializer):
+    """Список id рецептов для массового изменения избранного и корзины."""
+
+    recipes = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_MAX_SIZE,
+    )
@@ -0,0 +1,188 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes.models import Ingredient, IngredientInRecipesAmount, Recipe, Tag
+from recipes.search import update_search_vectors
+from users.models import Follow, User
+
+from .counters import (AUTHOR_COUNTERS, RECIPE_COUNTERS, change_counter,
+                       change_counters)
+from .feed import fan_out_recipe
+from .ingredient_index import ingredient_index
+from .renditions import delete_renditions, generate_renditions
+from .tag_registry import tag_registry
+from .utils import cart_users, recipe_amounts, update_shopping_lists
+from .versions import bump_recipes_version
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    """Сброс индекса ингредиентов при их изменении."""
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, **kwargs):
+    """
+    Обновление поискового вектора при сохранении рецепта.
+
+    Откладывается до фиксации транзакции: API и админка сохраняют
+    ингредиенты рецепта уже после него самого.
+    """
+    transaction.on_commit(partial(update_search_vectors, [instance.pk]))
+
+
+@receiver(pre_save, sender=Recipe)
+def compare_recipe_image(sender, instance, update_fields, **kwargs):
+    """Сравнение картинки рецепта с сохранённой в базе."""
+    instance._image_changed = bool(instance.image) and (
+        instance._state.adding
+        or (update_fields is None or 'image' in update_fields)
+        and sender.objects.filter(pk=instance.pk).values_list(
+            'image', flat=True
+        ).first() != instance.image.name
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_renditions(sender, instance, **kwargs):
+    """Построение вариантов картинки, если она сменилась."""
+    if getattr(instance, '_image_changed', False):
+        generate_renditions.enqueue(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, **kwargs):
+    """Раздача нового рецепта по лентам подписчиков в фоне."""
+    if created:
+        fan_out_recipe.enqueue(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_renditions(sender, instance, **kwargs):
+    """Удаление вариантов картинки вместе с рецептом."""
+    if instance.renditions:
+        delete_renditions.enqueue(instance.renditions)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_registry(sender, **kwargs):
+    """Сброс реестра тегов при их изменении."""
+    tag_registry.invalidate()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipe_on_relations_change(sender, instance, action, reverse,
+                                     pk_set, **kwargs):
+    """Обновление updated_at рецепта при изменении тегов и ингредиентов."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    recipe_ids = pk_set if reverse else (instance.pk,)
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now()
+        )
+
+
+@receiver(post_save, sender=IngredientInRecipesAmount)
+def touch_recipe_on_ingredient_save(sender, instance, **kwargs):
+    """Обновление updated_at рецепта при изменении количества ингредиента."""
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver(post_save, sender=IngredientInRecipesAmount)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def change_recipes_version(sender, **kwargs):
+    """Смена версии данных рецептов при их изменении."""
+    if kwargs.get('action', 'post_').startswith('post_'):
+        bump_recipes_version()
+
+
+@receiver(post_save, sender=User)
+def change_recipes_version_on_author_change(sender, instance, created,
+                                            update_fields, **kwargs):
+    """Смена версии рецептов при изменении данных их автора."""
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    if instance.recipes_count:
+        bump_recipes_version()
+
+
+@receiver(pre_delete, sender=Recipe)
+def forget_deleted_recipe(sender, instance, **kwargs):
+    """
+    Списки покупок при удалении рецепта через ORM: одно изменение на все
+    корзины с ним.
+
+    Срабатывает и при каскадном удалении автора. Нужен pre_delete: в том
+    же каскаде ингредиенты рецепта удаляются раньше него самого. Рецепт
+    блокируется раньше пользователей, как и при изменении корзины, а
+    строки корзин и избранного удаляются каскадом без сигналов.
+    """
+    list(Recipe.objects.select_for_update().filter(
+        pk=instance.pk
+    ).values_list('pk', flat=True))
+    update_shopping_lists(cart_users([instance.pk]), {
+        ingredient_id: -amount for ingredient_id, amount
+        in recipe_amounts(instance.pk).items()
+    })
+
+
+@receiver(pre_delete, sender=User)
+def forget_deleted_user_marks(sender, instance, **kwargs):
+    """
+    Счётчики рецептов при удалении пользователя: по UPDATE на избранное
+    и корзину. Его список покупок удаляется каскадом.
+    """
+    for model, field in RECIPE_COUNTERS.items():
+        change_counters(Recipe, list(model.objects.filter(
+            user=instance
+        ).values_list('recipe_id', flat=True)), field, -1)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Follow)
+def count_created_row(sender, instance, created, **kwargs):
+    """Счётчик рецептов или подписчиков автора при создании строки."""
+    if created:
+        change_counter(User, instance.author_id, AUTHOR_COUNTERS[sender], 1)
+
+
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=Follow)
+def count_moved_row(sender, instance, update_fields, **kwargs):
+    """Перенос счётчика при смене автора строки, например в админке."""
+    if instance._state.adding or (
+        update_fields is not None and 'author' not in update_fields
+    ):
+        return
+    old_author_id = sender.objects.filter(pk=instance.pk).values_list(
+        'author_id', flat=True
+    ).first()
+    if old_author_id is not None and old_author_id != instance.author_id:
+        change_counter(User, old_author_id, AUTHOR_COUNTERS[sender], -1)
+        change_counter(User, instance.author_id, AUTHOR_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Follow)
+def count_deleted_row(sender, instance, **kwargs):
+    """
+    Счётчик рецептов или подписчиков автора при удалении строки.
+
+    Срабатывает и при каскадном удалении пользователя, и при удалении
+    в админке.
+    """
+    change_counter(User, instance.author_id, AUTHOR_COUNTERS[sender], -1)
@@ -0,0 +1,69 @@
+import hashlib
+import json
+from collections import namedtuple
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.utils import timezone
+
+from recipes.models import Tag
+
+TagSnapshot = namedtuple(
+    'TagSnapshot', ('data', 'by_id', 'slugs', 'etag', 'last_modified')
+)
+
+
+class TagRegistry:
+    """Реестр тегов в памяти процесса.
+
+    Хранит сериализованный список тегов и его версию (ETag по
+    содержимому). Сбрасывается сигналами при изменении тегов, а в других
+    процессах — по истечении TAG_REGISTRY_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._snapshot = None
+        self._built_at = 0
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _build(self, previous):
+        from .serializers import TagSerializer
+
+        data = TagSerializer(Tag.objects.all(), many=True).data
+        etag = hashlib.md5(
+            json.dumps(data, sort_keys=True).encode()
+        ).hexdigest()
+        last_modified = timezone.now()
+        if previous is not None and previous.etag == etag:
+            last_modified = previous.last_modified
+        self._built_at = monotonic()
+        return TagSnapshot(
+            data=data,
+            by_id={tag['id']: tag for tag in data},
+            slugs=tuple(tag['slug'] for tag in data),
+            etag=etag,
+            last_modified=last_modified,
+        )
+
+    def _expired(self):
+        return monotonic() - self._built_at > settings.TAG_REGISTRY_TTL
+
+    def get(self):
+        snapshot = self._snapshot
+        if snapshot is None or self._expired():
+            with self._lock:
+                if self._snapshot is None or self._expired():
+                    self._snapshot = self._build(snapshot)
+                snapshot = self._snapshot
+        return snapshot
+
+
+tag_registry = TagRegistry()
+
+
+def tag_slug_choices():
+    return [(slug, slug) for slug in tag_registry.get().slugs]
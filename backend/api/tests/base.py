@@ -0,0 +1,78 @@
+import base64
+import io
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, IngredientInRecipesAmount, Recipe, Tag
+from users.models import User
+
+
+def image_data():
+    """Картинка в base64, как её присылает фронтенд."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username, email=f'{username}@x.ru', password=username,
+        first_name='a', last_name='b',
+    )
+
+
+def create_tag(slug):
+    return Tag.objects.create(name=slug, color='#ffffff', slug=slug)
+
+
+def create_ingredient(name):
+    return Ingredient.objects.create(name=name, measurement_unit='г')
+
+
+def create_recipe(author, name, amounts=(), tags=(), **fields):
+    """Рецепт через ORM; amounts — пары (ингредиент, количество)."""
+    recipe = Recipe.objects.create(
+        author=author, name=name, text='t', cooking_time=1,
+        image='recipes/test.png', **fields,
+    )
+    IngredientInRecipesAmount.objects.bulk_create(
+        IngredientInRecipesAmount(
+            recipe=recipe, ingredient=ingredient, amount=amount
+        )
+        for ingredient, amount in amounts
+    )
+    recipe.tags.set(tags)
+    return recipe
+
+
+class APITestBase(APITestCase):
+    """
+    Тесты API с временным каталогом медиафайлов и пустыми кэшами.
+
+    Кэши живут в памяти процесса и не откатываются вместе с базой,
+    поэтому очищаются перед каждым тестом.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.contrib import admin
+from django.test import TestCase
+from django.urls import reverse
+
+from api.admin_tools import AutocompleteFilter
+from recipes.models import (FavoriteReceipe, Ingredient,
+                            IngredientInRecipesAmount, Recipe, ShoppingCart)
+from users.models import Follow, User
+
+SEED_SIZE = 50
+# Запросов на странице списка: без параметров, с поиском и с сортировкой.
+LIST_QUERIES = {
+    'auth.group': 5,
+    'authtoken.tokenproxy': 5,
+    'users.user': 4,
+    'users.follow': 4,
+    'recipes.ingredient': 4,
+    'recipes.tag': 6,
+    'recipes.ingredientinrecipesamount': 4,
+    'recipes.recipe': 5,
+    'recipes.favoritereceipe': 4,
+    'recipes.shoppingcart': 4,
+    'tasks.task': 6,
+}
+# Запросов с выбранным значением фильтра-автодополнения.
+FILTER_QUERIES = {
+    'users.follow': {'user': 5, 'author': 5},
+    'recipes.ingredientinrecipesamount': {'recipe': 6, 'ingredient': 5},
+    'recipes.recipe': {'author': 6},
+    'recipes.favoritereceipe': {'user': 5, 'recipe': 6},
+    'recipes.shoppingcart': {'user': 5, 'recipe': 6},
+}
+
+
+def seed(size):
+    """Строки для всех списков админки."""
+    # Первичные ключи после bulk_create есть не во всех СУБД,
+    # поэтому строки перечитываются.
+    User.objects.bulk_create(
+        User(username=f'admin_check_{i}', email=f'admin_check_{i}@x.ru',
+             first_name='a', last_name='b')
+        for i in range(size)
+    )
+    users = list(User.objects.filter(username__startswith='admin_check_'))
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'admin check {i}', measurement_unit='г')
+        for i in range(size)
+    )
+    ingredients = list(Ingredient.objects.filter(
+        name__startswith='admin check '
+    ))
+    Recipe.objects.bulk_create(
+        Recipe(name=f'Admin check {i}', author=users[i], text='t',
+               cooking_time=1, image='recipes/admin_check.png')
+        for i in range(size)
+    )
+    recipes = list(Recipe.objects.filter(name__startswith='Admin check '))
+    pairs = list(zip(users, recipes[1:] + recipes[:1]))
+    IngredientInRecipesAmount.objects.bulk_create(
+        IngredientInRecipesAmount(recipe=recipe, ingredient=ingredient,
+                                  amount=1)
+        for recipe, ingredient in zip(recipes, ingredients)
+    )
+    FavoriteReceipe.objects.bulk_create(
+        FavoriteReceipe(user=user, recipe=recipe) for user, recipe in pairs
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=user, recipe=recipe) for user, recipe in pairs
+    )
+    Follow.objects.bulk_create(
+        Follow(user=user, author=recipe.author) for user, recipe in pairs
+    )
+
+
+def autocomplete_filters(model_admin):
+    return [
+        list_filter.field_name for list_filter in model_admin.list_filter
+        if isinstance(list_filter, type)
+        and issubclass(list_filter, AutocompleteFilter)
+    ]
+
+
+# Оценка числа строк по статистике PostgreSQL — лишний запрос только в
+# этой СУБД; без неё число запросов одинаково во всех базах.
+@mock.patch('api.admin_tools.estimate_count', return_value=None)
+class AdminChangelistQueriesTest(TestCase):
+    """Число SQL-запросов на страницах списков админки не растёт."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(SEED_SIZE)
+        cls.admin = User.objects.create_superuser(
+            username='admin_check', email='admin_check@x.ru',
+            password='admin_check', first_name='a', last_name='b',
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelists(self):
+        for model, model_admin in admin.site._registry.items():
+            label = model._meta.label_lower
+            url = reverse(
+                f'admin:{model._meta.app_label}_{model._meta.model_name}'
+                '_changelist'
+            )
+            yield label, url, model, model_admin
+
+    def assert_page(self, url, queries):
+        with self.subTest(url=url), self.assertNumQueries(queries):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_every_changelist_has_budget(self, estimate_count):
+        self.assertEqual(
+            {label for label, *_ in self.changelists()}, set(LIST_QUERIES)
+        )
+
+    def test_changelist_queries(self, estimate_count):
+        for label, url, model, model_admin in self.changelists():
+            for query in ('', '?q=admin', '?o=-1'):
+                self.assert_page(url + query, LIST_QUERIES[label])
+
+    def test_autocomplete_filter_queries(self, estimate_count):
+        for label, url, model, model_admin in self.changelists():
+            fields = autocomplete_filters(model_admin)
+            self.assertEqual(set(fields), set(FILTER_QUERIES.get(label, {})))
+            for field_name in fields:
+                related = model._meta.get_field(
+                    field_name
+                ).remote_field.model.objects.order_by('pk').first()
+                self.assert_page(
+                    f'{url}?{field_name}__id__exact={related.pk}',
+                    FILTER_QUERIES[label][field_name],
+                )
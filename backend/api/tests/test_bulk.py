@@ -0,0 +1,121 @@
+from api.utils import recipe_amounts
+from recipes.models import (FavoriteReceipe, Recipe, ShoppingCart,
+                            ShoppingListIngredient)
+
+from .base import APITestBase, create_ingredient, create_recipe, create_user
+
+
+class BulkRecipesTest(APITestBase):
+    """Массовое изменение избранного и корзины с результатом по каждому id."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('bulk_user')
+        author = create_user('bulk_author')
+        flour, milk = create_ingredient('мука'), create_ingredient('молоко')
+        cls.recipes = [
+            create_recipe(author, 'Блины', ((flour, 200), (milk, 500))),
+            create_recipe(author, 'Оладьи', ((flour, 300),)),
+            create_recipe(author, 'Омлет', ((milk, 100),)),
+        ]
+        cls.missing = max(recipe.pk for recipe in cls.recipes) + 1
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def bulk(self, method, url, recipe_ids):
+        response = getattr(self.client, method)(
+            url, {'recipes': recipe_ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return [(item['id'], item['status'])
+                for item in response.data['recipes']]
+
+    def counters(self, field):
+        return dict(Recipe.objects.values_list('pk', field))
+
+    def shopping_list(self):
+        expected = {}
+        for recipe_id in ShoppingCart.objects.filter(
+            user=self.user
+        ).values_list('recipe_id', flat=True):
+            for ingredient_id, amount in recipe_amounts(recipe_id).items():
+                expected[ingredient_id] = (
+                    expected.get(ingredient_id, 0) + amount
+                )
+        return expected
+
+    def test_favorite_statuses(self):
+        url = '/api/recipes/favorite/bulk/'
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        self.assertEqual(self.bulk('post', url, [first, second, first]), [
+            (first, 'added'), (second, 'added'),
+        ])
+        self.assertEqual(
+            self.bulk('post', url, [second, third, self.missing]),
+            [(second, 'exists'), (third, 'added'),
+             (self.missing, 'not_found')],
+        )
+        self.assertEqual(self.counters('favorites_count'), {
+            first: 1, second: 1, third: 1,
+        })
+        self.assertEqual(self.bulk('delete', url, [first, self.missing]), [
+            (first, 'removed'), (self.missing, 'absent'),
+        ])
+        self.assertEqual(set(FavoriteReceipe.objects.filter(
+            user=self.user
+        ).values_list('recipe_id', flat=True)), {second, third})
+        self.assertEqual(self.counters('favorites_count'), {
+            first: 0, second: 1, third: 1,
+        })
+
+    def test_cart_statuses_and_shopping_list(self):
+        url = '/api/recipes/shopping_cart/bulk/'
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        self.assertEqual(self.bulk('post', url, [first, second]), [
+            (first, 'added'), (second, 'added'),
+        ])
+        self.assertEqual(self.bulk('post', url, [second, third]), [
+            (second, 'exists'), (third, 'added'),
+        ])
+        self.assertEqual(self.bulk('delete', url, [second, second]), [
+            (second, 'removed'),
+        ])
+        self.assertEqual(self.counters('carts_count'), {
+            first: 1, second: 0, third: 1,
+        })
+        self.assertEqual(dict(ShoppingListIngredient.objects.filter(
+            user=self.user
+        ).values_list('ingredient_id', 'amount')), self.shopping_list())
+
+    def test_clear_cart(self):
+        self.bulk(
+            'post', '/api/recipes/shopping_cart/bulk/',
+            [recipe.pk for recipe in self.recipes],
+        )
+        response = self.client.delete('/api/recipes/shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(response.data['recipes']),
+            sorted(recipe.pk for recipe in self.recipes),
+        )
+        self.assertFalse(ShoppingCart.objects.filter(user=self.user).exists())
+        self.assertFalse(
+            ShoppingListIngredient.objects.filter(user=self.user).exists()
+        )
+        self.assertEqual(set(self.counters('carts_count').values()), {0})
+        response = self.client.delete('/api/recipes/shopping_cart/')
+        self.assertEqual(response.data['recipes'], [])
+
+    def test_invalid_requests(self):
+        url = '/api/recipes/favorite/bulk/'
+        for data in ({'recipes': []}, {'recipes': [0]}, {}):
+            self.assertEqual(
+                self.client.post(url, data, format='json').status_code, 400
+            )
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(
+            url, {'recipes': [self.recipes[0].pk]}, format='json'
+        ).status_code, 401)
+        self.assertFalse(FavoriteReceipe.objects.exists())
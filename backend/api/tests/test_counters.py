@@ -0,0 +1,70 @@
+from api.counters import reconcile
+from users.models import Follow, User
+
+from .base import (APITestBase, create_ingredient, create_recipe, create_tag,
+                   create_user, image_data)
+
+
+class AuthorCountersTest(APITestBase):
+    """Счётчики рецептов и подписчиков при любых путях изменения."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('counters_author')
+        cls.other = create_user('counters_other')
+        cls.reader = create_user('counters_reader')
+
+    def assert_counters(self, user, recipes, followers):
+        user.refresh_from_db(fields=('recipes_count', 'followers_count'))
+        self.assertEqual(
+            (user.recipes_count, user.followers_count), (recipes, followers)
+        )
+        # Пересчёт по данным не находит расхождений.
+        self.assertEqual(reconcile(User), 0)
+
+    def test_api_counts_once(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.post('/api/recipes/', {
+            'name': 'Counters check', 'text': 't', 'cooking_time': 1,
+            'image': image_data(), 'tags': [create_tag('counters').pk],
+            'ingredients': [
+                {'id': create_ingredient('counters').pk, 'amount': 1}
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assert_counters(self.author, 1, 0)
+        self.client.force_authenticate(self.reader)
+        url = f'/api/users/{self.author.pk}/subscribe/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assert_counters(self.author, 1, 1)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assert_counters(self.author, 1, 0)
+        self.client.force_authenticate(self.author)
+        self.assertEqual(
+            self.client.delete(
+                f'/api/recipes/{response.data["id"]}/'
+            ).status_code,
+            204,
+        )
+        self.assert_counters(self.author, 0, 0)
+
+    def test_author_change(self):
+        recipe = create_recipe(self.author, 'Counters moved')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assert_counters(self.author, 1, 1)
+        recipe.author = self.other
+        recipe.save()
+        follow.author = self.other
+        follow.save()
+        self.assert_counters(self.author, 0, 0)
+        self.assert_counters(self.other, 1, 1)
+
+    def test_cascades(self):
+        create_recipe(self.author, 'Counters cascade')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.other)
+        self.assert_counters(self.other, 0, 1)
+        self.reader.delete()
+        self.assert_counters(self.author, 1, 0)
+        self.author.delete()
+        self.assert_counters(self.other, 0, 0)
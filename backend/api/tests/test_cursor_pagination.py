@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from recipes.models import Recipe
+from users.models import Follow
+
+from .base import APITestBase, create_recipe, create_user
+
+
+class CursorPaginationTest(APITestBase):
+    """Страницы по курсору не повторяют и не теряют строки при вставках."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('cursor_reader')
+        cls.author = create_user('cursor_author')
+        start = timezone.now() - timedelta(days=1)
+        # Два рецепта с одинаковым pub_date: порядок решает id.
+        for index, minutes in enumerate((0, 1, 2, 2, 3)):
+            recipe = create_recipe(cls.author, f'Курсор {index}')
+            Recipe.objects.filter(pk=recipe.pk).update(
+                pub_date=start + timedelta(minutes=minutes)
+            )
+        cls.recipe_names = list(Recipe.objects.order_by(
+            '-pub_date', '-pk'
+        ).values_list('name', flat=True))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.reader)
+
+    def walk(self, url, insert):
+        """Все страницы по ссылкам next; insert вызывается после первой."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            self.assertIsNone(response.data['previous'])
+            pages.append(response.data['results'])
+            url = response.data['next']
+            if len(pages) == 1:
+                insert()
+        return pages
+
+    def test_recipes_stable_across_inserts(self):
+        pages = self.walk(
+            '/api/recipes/?cursor=&limit=2',
+            lambda: create_recipe(self.author, 'Курсор новый'),
+        )
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(
+            [recipe['name'] for page in pages for recipe in page],
+            self.recipe_names,
+        )
+
+    def test_subscriptions_stable_across_inserts(self):
+        authors = [create_user(f'cursor_followed_{i}') for i in range(5)]
+        for author in authors:
+            Follow.objects.create(user=self.reader, author=author)
+        pages = self.walk(
+            '/api/users/subscriptions/?cursor=&limit=2',
+            lambda: Follow.objects.create(
+                user=self.reader, author=create_user('cursor_followed_new')
+            ),
+        )
+        self.assertEqual(
+            [author['username'] for page in pages for author in page],
+            [author.username for author in reversed(authors)],
+        )
+
+    def test_invalid_cursor(self):
+        self.assertEqual(
+            self.client.get('/api/recipes/?cursor=broken').status_code, 404
+        )
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from api.feed import fan_out_recipe
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow
+
+from .base import APITestBase, create_recipe, create_user
+
+
+@override_settings(FEED_BACKFILL_SIZE=2, FEED_FANOUT_MAX_FOLLOWERS=1)
+class FeedTest(APITestBase):
+    """Лента подписок: заполнение, очистка и авторы с чтением при выдаче."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('feed_reader')
+        cls.author = create_user('feed_author')
+        # У star подписчиков больше FEED_FANOUT_MAX_FOLLOWERS.
+        cls.star = create_user('feed_star')
+        for i in range(2):
+            Follow.objects.create(
+                user=create_user(f'feed_fan_{i}'), author=cls.star
+            )
+        start = timezone.now() - timedelta(days=1)
+        for minutes, author in enumerate(
+            (cls.author, cls.star, cls.author, cls.star, cls.author)
+        ):
+            recipe = create_recipe(author, f'Лента {minutes}')
+            Recipe.objects.filter(pk=recipe.pk).update(
+                pub_date=start + timedelta(minutes=minutes)
+            )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.reader)
+
+    def subscribe(self, author, method='post'):
+        return getattr(self.client, method)(
+            f'/api/users/{author.pk}/subscribe/'
+        ).status_code
+
+    def feed_entries(self, author):
+        return list(FeedEntry.objects.filter(
+            user=self.reader, author=author
+        ).order_by('-pub_date').values_list('recipe__name', flat=True))
+
+    def feed_names(self):
+        names = []
+        url = '/api/recipes/feed/?limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            names.extend(recipe['name'] for recipe in response.data['results'])
+            url = response.data['next']
+        return names
+
+    def test_backfill_fan_out_and_prune(self):
+        self.assertEqual(self.subscribe(self.author), 201)
+        self.assertEqual(
+            self.feed_entries(self.author), ['Лента 4', 'Лента 2']
+        )
+        self.assertEqual(self.feed_names(), ['Лента 4', 'Лента 2'])
+        fan_out_recipe(create_recipe(self.author, 'Лента новая').pk)
+        self.assertEqual(
+            self.feed_names(), ['Лента новая', 'Лента 4', 'Лента 2']
+        )
+        self.assertEqual(self.subscribe(self.author, 'delete'), 204)
+        self.assertEqual(self.feed_entries(self.author), [])
+        self.assertEqual(self.feed_names(), [])
+
+    def test_large_author_read_from_recipes(self):
+        self.assertEqual(self.subscribe(self.star), 201)
+        self.assertEqual(self.subscribe(self.author), 201)
+        fan_out_recipe(create_recipe(self.star, 'Лента звезды').pk)
+        self.assertEqual(self.feed_entries(self.star), [])
+        self.assertEqual(self.feed_names(), [
+            'Лента звезды', 'Лента 4', 'Лента 3', 'Лента 2', 'Лента 1',
+        ])
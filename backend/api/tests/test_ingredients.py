@@ -0,0 +1,30 @@
+import tempfile
+
+from api.management.commands.load_data import import_data
+from recipes.models import Ingredient
+
+from .base import APITestBase
+
+
+class IngredientNamesTest(APITestBase):
+    """Импорт, форма и поиск приводят названия к одному виду."""
+
+    def test_import_clean_and_search_agree(self):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', encoding='utf-8'
+        ) as file:
+            file.write(' Мука  Пшеничная ,Г\nмука пшеничная,г \n')
+            file.flush()
+            self.assertEqual(import_data(file.name), (1, 0))
+        ingredient = Ingredient(
+            name='мука   пшеничная ', measurement_unit=' Г'
+        )
+        ingredient.clean()
+        self.assertEqual(
+            list(Ingredient.objects.values_list('name', 'measurement_unit')),
+            [(ingredient.name, ingredient.measurement_unit)],
+        )
+        response = self.client.get('/api/ingredients/?name= МУКА  пш')
+        self.assertEqual(
+            [item['name'] for item in response.data], ['мука пшеничная']
+        )
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe
+from users.models import User
+
+RECIPES = 5
+LIMIT = 2
+
+
+@override_settings(RECIPES_COUNT_ESTIMATE_THRESHOLD=1)
+class EstimatedCountPaginationTest(APITestCase):
+    """Оценка числа рецептов не влияет на переход по страницам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='pages_check', email='pages_check@x.ru',
+            password='pages_check', first_name='a', last_name='b',
+        )
+        # bulk_create не отправляет сигналы, поэтому для рецептов
+        # не ставятся фоновые задачи картинок и ленты.
+        Recipe.objects.bulk_create(
+            Recipe(name=f'Pages check {i}', author=cls.user, text='t',
+                   cooking_time=1, image='recipes/pages_check.png')
+            for i in range(RECIPES)
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_page(self, estimate, page):
+        with mock.patch(
+            'api.pagination.estimate_count', return_value=estimate
+        ):
+            return self.client.get(
+                f'/api/recipes/?limit={LIMIT}&page={page}'
+            )
+
+    def assert_pages(self, estimate):
+        names = []
+        for page in (1, 2, 3):
+            response = self.get_page(estimate, page)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['count'], estimate)
+            self.assertTrue(response.data['count_estimated'])
+            self.assertEqual(response.data['next'] is None, page == 3)
+            self.assertEqual(response.data['previous'] is None, page == 1)
+            names.extend(recipe['name'] for recipe in response.data['results'])
+        self.assertCountEqual(
+            names, Recipe.objects.values_list('name', flat=True)
+        )
+        self.assertEqual(self.get_page(estimate, 4).status_code, 404)
+
+    def test_estimate_below_total(self):
+        self.assert_pages(2)
+
+    def test_estimate_above_total(self):
+        self.assert_pages(100)
+
+    def test_exact_count_without_estimate(self):
+        response = self.get_page(None, 3)
+        self.assertEqual(response.data['count'], RECIPES)
+        self.assertFalse(response.data['count_estimated'])
+        self.assertIsNone(response.data['next'])
@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.db import DatabaseError
+
+from recipes.models import IngredientInRecipesAmount, Tag
+
+from .base import (APITestBase, create_ingredient, create_recipe, create_tag,
+                   create_user, image_data)
+
+
+class RecipeUpdateTest(APITestBase):
+    """Изменение рецепта по разнице составов в одной транзакции."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('update_author')
+        cls.flour, cls.milk, cls.eggs = (
+            create_ingredient(name) for name in ('мука', 'молоко', 'яйца')
+        )
+        cls.breakfast = create_tag('breakfast')
+        cls.dinner = Tag.objects.create(
+            name='dinner', color='#000000', slug='dinner'
+        )
+        cls.recipe = create_recipe(
+            cls.author, 'Блины', ((cls.flour, 200), (cls.milk, 500)),
+            tags=(cls.breakfast,),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def rows(self):
+        return {
+            ingredient_id: (pk, amount)
+            for pk, ingredient_id, amount
+            in IngredientInRecipesAmount.objects.filter(
+                recipe=self.recipe
+            ).values_list('pk', 'ingredient_id', 'amount')
+        }
+
+    def tags(self):
+        return set(self.recipe.tags.values_list('slug', flat=True))
+
+    def update(self, ingredients, tags):
+        return self.client.patch(f'/api/recipes/{self.recipe.pk}/', {
+            'name': 'Блины', 'text': 't', 'cooking_time': 1,
+            'image': image_data(), 'tags': [tag.pk for tag in tags],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': amount}
+                for ingredient, amount in ingredients
+            ],
+        }, format='json')
+
+    def test_only_changed_rows_are_written(self):
+        before = self.rows()
+        response = self.update(
+            ((self.milk, 300), (self.eggs, 2)), (self.dinner,)
+        )
+        self.assertEqual(response.status_code, 200)
+        after = self.rows()
+        self.assertEqual(set(after), {self.milk.pk, self.eggs.pk})
+        self.assertEqual(after[self.milk.pk], (before[self.milk.pk][0], 300))
+        self.assertEqual(after[self.eggs.pk][1], 2)
+        self.assertEqual(self.tags(), {'dinner'})
+
+    def test_failed_update_changes_nothing(self):
+        before = self.rows()
+        with mock.patch.object(
+            IngredientInRecipesAmount.objects, 'bulk_update',
+            side_effect=DatabaseError,
+        ), self.assertRaises(DatabaseError):
+            self.update(((self.milk, 300), (self.eggs, 2)), (self.dinner,))
+        self.assertEqual(self.rows(), before)
+        self.assertEqual(self.tags(), {'breakfast'})
@@ -0,0 +1,25 @@
+from tasks.models import Task
+
+from .base import APITestBase, create_recipe, create_user
+
+
+class RenditionJobsTest(APITestBase):
+    """Задача построения вариантов ставится только при смене картинки."""
+
+    def rendition_jobs(self):
+        return Task.objects.filter(
+            name='api.renditions.generate_renditions'
+        ).count()
+
+    def test_enqueued_on_image_change_only(self):
+        recipe = create_recipe(create_user('renditions_author'), 'Варианты')
+        self.assertEqual(self.rendition_jobs(), 1)
+        recipe.name = 'Варианты картинки'
+        recipe.save()
+        recipe.image = 'recipes/test.png'
+        recipe.save()
+        recipe.save(update_fields=('cooking_time',))
+        self.assertEqual(self.rendition_jobs(), 1)
+        recipe.image = 'recipes/other.png'
+        recipe.save()
+        self.assertEqual(self.rendition_jobs(), 2)
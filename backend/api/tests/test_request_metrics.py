@@ -0,0 +1,49 @@
+import json
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, ShoppingListIngredient
+from users.models import User
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True)
+class RequestMetricsTest(TestCase):
+    """Метрики запросов, в том числе с потоковым телом ответа."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='metrics_check', email='metrics_check@x.ru',
+            password='metrics_check', first_name='a', last_name='b',
+        )
+        ShoppingListIngredient.objects.create(
+            user=cls.user, amount=3, ingredient=Ingredient.objects.create(
+                name='metrics check', measurement_unit='г'
+            ),
+        )
+
+    def setUp(self):
+        # Цепочка middleware собирается клиентом при первом запросе,
+        # уже с включённой настройкой.
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def logged(self, records):
+        return json.loads(records.records[-1].getMessage())
+
+    def test_response_has_server_timing(self):
+        with self.assertLogs('foodgram.requests') as records:
+            response = self.client.get('/api/ingredients/')
+        self.assertIn('queries, ', response['Server-Timing'])
+        self.assertGreater(self.logged(records)['queries'], 0)
+
+    def test_streaming_body_queries_are_counted(self):
+        with self.assertLogs('foodgram.requests') as records:
+            response = self.client.get('/api/recipes/download_shopping_cart/')
+            self.assertTrue(response.streaming)
+            self.assertFalse(records.records)
+            body = b''.join(response.streaming_content)
+        self.assertIn('metrics check'.encode(), body)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.logged(records)['queries'], 1)
@@ -0,0 +1,37 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import (APITestBase, create_ingredient, create_tag, create_user,
+                   image_data)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Нужна PostgreSQL.')
+class RecipeSearchVectorTest(APITestBase):
+    """Поисковый вектор рецепта строится один раз и с ингредиентами."""
+
+    def test_created_recipe_found_by_ingredient(self):
+        user = create_user('search_check')
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/recipes/', {
+                'name': 'Омлет', 'text': 'Взбить и пожарить.',
+                'cooking_time': 1, 'image': image_data(),
+                'tags': [create_tag('search').pk],
+                'ingredients': [
+                    {'id': create_ingredient('тыква').pk, 'amount': 1}
+                ],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sum(
+            query['sql'].startswith('UPDATE')
+            and 'search_vector' in query['sql']
+            for query in queries.captured_queries
+        ), 1)
+        found = self.client.get('/api/recipes/?search=тыква&limit=10')
+        self.assertEqual(
+            [recipe['id'] for recipe in found.data['results']],
+            [response.data['id']],
+        )
@@ -0,0 +1,186 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.utils import recipe_amounts
+from recipes.models import Recipe, ShoppingCart, ShoppingListIngredient
+
+from .base import (APITestBase, create_ingredient, create_recipe, create_tag,
+                   create_user, image_data)
+
+
+def admin_form_data(response):
+    """Данные формы изменения в админке с её текущими значениями."""
+    data = {}
+    forms = [response.context['adminform'].form]
+    for formset in response.context['inline_admin_formsets']:
+        management = formset.formset.management_form
+        data.update({
+            management.add_prefix(name): value
+            for name, value in management.initial.items()
+        })
+        forms.extend(formset.formset.forms)
+    for form in forms:
+        for name, field in form.fields.items():
+            value = form[name].value()
+            if value is None or name == 'image':
+                continue
+            data[form.add_prefix(name)] = value
+    return data
+
+
+class ShoppingListsTest(APITestBase):
+    """Список покупок совпадает с суммой ингредиентов рецептов корзины."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('lists_author')
+        cls.buyers = [create_user(f'lists_buyer_{i}') for i in range(3)]
+        cls.flour, cls.milk, cls.eggs = (
+            create_ingredient(name) for name in ('мука', 'молоко', 'яйца')
+        )
+        cls.tag = create_tag('lists')
+        cls.pancakes = create_recipe(
+            cls.author, 'Блины', ((cls.flour, 200), (cls.milk, 500)),
+            tags=(cls.tag,),
+        )
+        cls.omelette = create_recipe(
+            cls.author, 'Омлет', ((cls.milk, 100), (cls.eggs, 3)),
+            tags=(cls.tag,),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.buyers[0])
+
+    def assert_lists(self):
+        for user in [self.author, *self.buyers]:
+            expected = {}
+            for recipe_id in ShoppingCart.objects.filter(
+                user=user
+            ).values_list('recipe_id', flat=True):
+                for ingredient_id, amount in recipe_amounts(
+                    recipe_id
+                ).items():
+                    expected[ingredient_id] = (
+                        expected.get(ingredient_id, 0) + amount
+                    )
+            self.assertEqual(dict(ShoppingListIngredient.objects.filter(
+                user=user
+            ).values_list('ingredient_id', 'amount')), expected, user)
+        for recipe in Recipe.objects.all():
+            self.assertEqual(
+                recipe.carts_count, recipe.shopping_recipes.count()
+            )
+
+    def add_to_carts(self, recipe, users):
+        for user in users:
+            self.client.force_authenticate(user)
+            self.assertEqual(self.client.post(
+                f'/api/recipes/{recipe.pk}/shopping_cart/'
+            ).status_code, 201)
+
+    def test_add_and_remove(self):
+        self.add_to_carts(self.pancakes, self.buyers[:1])
+        self.add_to_carts(self.omelette, self.buyers[:1])
+        self.assert_lists()
+        self.assertEqual(self.client.delete(
+            f'/api/recipes/{self.pancakes.pk}/shopping_cart/'
+        ).status_code, 204)
+        self.assert_lists()
+
+    def test_clear(self):
+        self.add_to_carts(self.pancakes, self.buyers[:1])
+        self.add_to_carts(self.omelette, self.buyers[:1])
+        self.assertEqual(
+            self.client.delete('/api/recipes/shopping_cart/').status_code,
+            200,
+        )
+        self.assertFalse(ShoppingListIngredient.objects.exists())
+        self.assert_lists()
+
+    def test_update_amounts(self):
+        self.add_to_carts(self.pancakes, self.buyers)
+        self.add_to_carts(self.omelette, self.buyers[:1])
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.pancakes.pk}/', {
+                'name': 'Блины', 'text': 't', 'cooking_time': 1,
+                'image': image_data(), 'tags': [self.tag.pk],
+                'ingredients': [
+                    {'id': self.flour.pk, 'amount': 250},
+                    {'id': self.eggs.pk, 'amount': 2},
+                ],
+            }, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_lists()
+
+    def test_recipe_delete(self):
+        self.add_to_carts(self.pancakes, self.buyers)
+        self.add_to_carts(self.omelette, self.buyers[:2])
+        self.client.force_authenticate(self.author)
+        self.assertEqual(
+            self.client.delete(f'/api/recipes/{self.pancakes.pk}/')
+            .status_code,
+            204,
+        )
+        self.assert_lists()
+
+    def test_recipe_delete_queries_do_not_depend_on_carts(self):
+        queries = []
+        for recipe, users in (
+            (self.pancakes, self.buyers[:1]), (self.omelette, self.buyers)
+        ):
+            self.add_to_carts(recipe, users)
+            with CaptureQueriesContext(connection) as captured:
+                recipe.delete()
+            queries.append(len(captured))
+            self.assert_lists()
+        self.assertEqual(queries[0], queries[1])
+
+    def test_author_delete(self):
+        self.add_to_carts(self.pancakes, self.buyers)
+        self.add_to_carts(self.omelette, [self.author, self.buyers[0]])
+        self.buyers[1].delete()
+        self.assert_lists()
+        self.author.delete()
+        self.assertFalse(ShoppingListIngredient.objects.exists())
+        self.assert_lists()
+
+    def test_admin_ingredient_inline(self):
+        self.add_to_carts(self.pancakes, self.buyers[:2])
+        admin = create_user('lists_admin')
+        admin.is_staff = admin.is_superuser = True
+        admin.save()
+        self.client.force_login(admin)
+        url = reverse('admin:recipes_recipe_change', args=(self.pancakes.pk,))
+        data = admin_form_data(self.client.get(url))
+        for name, value in list(data.items()):
+            if name.endswith('-amount'):
+                data[name] = value + 1
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(recipe_amounts(self.pancakes.pk), {
+            self.flour.pk: 201, self.milk.pk: 501,
+        })
+        self.assert_lists()
+
+    def test_admin_cart_delete(self):
+        self.add_to_carts(self.pancakes, self.buyers)
+        self.add_to_carts(self.omelette, self.buyers[:1])
+        admin = create_user('lists_admin')
+        admin.is_staff = admin.is_superuser = True
+        admin.save()
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse('admin:recipes_shoppingcart_changelist'), {
+                'action': 'delete_selected', 'post': 'yes',
+                '_selected_action': list(ShoppingCart.objects.filter(
+                    user__in=self.buyers[:2], recipe=self.pancakes
+                ).values_list('pk', flat=True)),
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ShoppingCart.objects.count(), 2)
+        self.assert_lists()
@@ -0,0 +1,46 @@
+import threading
+
+from django.test import TransactionTestCase
+
+from tasks.models import Task
+from tasks.queue import claim, task
+from tasks.worker import Worker
+
+release = threading.Event()
+
+
+@task(queue='test_worker', timeout=0, max_attempts=1)
+def blocking_task():
+    release.wait(10)
+
+
+class WorkerLeaseTest(TransactionTestCase):
+    """
+    Просроченная задача остаётся за обработчиком до конца потока.
+
+    Обработчик закрывает соединения между проходами, поэтому тест идёт
+    без общей транзакции.
+    """
+
+    def setUp(self):
+        release.clear()
+        self.addCleanup(release.set)
+
+    def test_overdue_task_is_not_claimed_again(self):
+        blocking_task.enqueue()
+        worker = Worker({'test_worker': 1})
+        self.assertEqual(worker.poll(), 1)
+        pk = Task.objects.get().pk
+        with self.assertLogs('tasks.worker', 'WARNING'):
+            worker.reap('test_worker')
+        task = Task.objects.get(pk=pk)
+        self.assertEqual(task.status, Task.RUNNING)
+        self.assertEqual(task.attempts, 1)
+        self.assertIsNone(claim('test_worker', 'other'))
+        self.assertEqual(worker.busy('test_worker'), 1)
+
+        release.set()
+        next(iter(worker.running['test_worker'])).result(10)
+        worker.reap('test_worker')
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(worker.busy('test_worker'), 0)
@@ -0,0 +1,96 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from api.utils import recipe_amounts
+from recipes.models import (FavoriteReceipe, Ingredient,
+                            IngredientInRecipesAmount, Recipe, ShoppingCart,
+                            ShoppingListIngredient)
+from users.models import User
+
+PARALLEL = 8
+ROUNDS = 3
+# Ожидаемые ответы на серию одинаковых запросов: ровно один успешный.
+EXPECTED = {
+    'post': (201, 400),
+    'delete': (204, 400),
+}
+
+
+def fire(user, method, url, parallel):
+    """Одновременная отправка parallel одинаковых запросов."""
+    barrier = threading.Barrier(parallel)
+
+    def send(_):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            barrier.wait()
+            return getattr(client, method)(url).status_code
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(parallel) as executor:
+        return list(executor.map(send, range(parallel)))
+
+
+# Запросы идут из потоков по отдельным соединениям, поэтому данные должны
+# быть зафиксированы; SQLite не допускает параллельной записи.
+@skipUnless(connection.vendor == 'postgresql', 'Нужна PostgreSQL.')
+class ToggleRacesTest(TransactionTestCase):
+    """Параллельные одинаковые запросы к избранному и корзине."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='race_check', email='race_check@x.ru',
+            password='race_check', first_name='a', last_name='b',
+        )
+        # bulk_create не отправляет сигналы, поэтому для рецепта
+        # не ставятся фоновые задачи картинок и ленты.
+        Recipe.objects.bulk_create([Recipe(
+            name='Race check', author=self.user, text='t', cooking_time=1,
+            image='recipes/race_check.png',
+        )])
+        self.recipe = Recipe.objects.get(author=self.user)
+        IngredientInRecipesAmount.objects.create(
+            recipe=self.recipe, amount=7,
+            ingredient=Ingredient.objects.create(
+                name='race check', measurement_unit='г'
+            ),
+        )
+
+    def assert_toggles(self, name, model, counter):
+        url = f'/api/recipes/{self.recipe.pk}/{name}/'
+        for round_number in range(ROUNDS):
+            for method, (success, repeat) in EXPECTED.items():
+                with self.subTest(method=method, round=round_number):
+                    statuses = fire(self.user, method, url, PARALLEL)
+                    self.assertCountEqual(
+                        statuses, [success] + [repeat] * (PARALLEL - 1)
+                    )
+                    self.assert_state(model, counter, method == 'post')
+
+    def assert_state(self, model, counter, added):
+        rows = model.objects.filter(
+            user=self.user, recipe=self.recipe
+        ).count()
+        self.assertEqual(rows, int(added))
+        self.recipe.refresh_from_db(fields=(counter,))
+        self.assertEqual(getattr(self.recipe, counter), rows)
+        if model is ShoppingCart:
+            shopping_list = dict(ShoppingListIngredient.objects.filter(
+                user=self.user
+            ).values_list('ingredient_id', 'amount'))
+            self.assertEqual(
+                shopping_list, recipe_amounts(self.recipe) if added else {}
+            )
+
+    def test_favorite(self):
+        self.assert_toggles('favorite', FavoriteReceipe, 'favorites_count')
+
+    def test_shopping_cart(self):
+        self.assert_toggles('shopping_cart', ShoppingCart, 'carts_count')
@@ -0,0 +1,27 @@
+from django.test import override_settings
+
+from api.checks import check_shared_cache
+from api.versions import get_recipes_version
+
+from .base import APITestBase, create_tag
+
+
+class RecipesVersionTest(APITestBase):
+    """Версия рецептов меняется после фиксации и хранится в общем кэше."""
+
+    def test_bumped_on_commit(self):
+        version = get_recipes_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_tag('versions')
+            self.assertEqual(get_recipes_version(), version)
+        self.assertEqual(get_recipes_version(), version + 1)
+
+    @override_settings(DEBUG=False, CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    })
+    def test_process_local_cache_rejected(self):
+        self.assertEqual(
+            [error.id for error in check_shared_cache(None)], ['api.E001']
+        )
@@ -1,20 +1,262 @@
-from django.shortcuts import HttpResponse
+import csv
+import hashlib
+import json
+from contextlib import contextmanager
 
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 
-def shopping_cart_file(ingredients):
-    """Загрузка списка покупок с ингредиентами."""
+from recipes.models import (FavoriteReceipe, IngredientInRecipesAmount,
+                            ShoppingCart, ShoppingListIngredient)
+from users.models import Follow, User
 
-    shopping_list = 'Список покупок: \n'
+from .versions import get_recipes_changed, get_recipes_version
+
+SHOPPING_CART_CHUNK_SIZE = 2000
+SHOPPING_CART_CONTENT_TYPES = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json; charset=utf-8',
+}
+
+
+def get_subscriptions(request):
+    """Множество id авторов, на которых подписан пользователь запроса.
+
+    Загружается одним запросом и хранится в запросе, поэтому все
+    сериализаторы одного запроса используют общий результат.
+    """
+
+    http_request = getattr(request, '_request', request)
+    if not hasattr(http_request, '_subscriptions'):
+        user = request.user
+        http_request._subscriptions = set(
+            user.follower.values_list('author_id', flat=True)
+        ) if user.is_authenticated else set()
+    return http_request._subscriptions
+
+
+def user_state_version(user):
+    """Версия избранного, корзины и подписок пользователя.
+
+    Число строк и максимальный id каждой таблицы меняются при любом
+    добавлении или удалении, поэтому их достаточно для валидатора.
+    Считается одним запросом.
+    """
+
+    if not user.is_authenticated:
+        return ''
+    stats = {}
+    for model in (FavoriteReceipe, ShoppingCart, Follow):
+        rows = model.objects.filter(
+            user=OuterRef('pk')
+        ).order_by().values('user')
+        name = model._meta.model_name
+        stats[f'{name}_count'] = Subquery(
+            rows.annotate(total=Count('pk')).values('total')
+        )
+        stats[f'{name}_last'] = Subquery(
+            rows.annotate(last=Max('pk')).values('last')
+        )
+    values = User.objects.filter(pk=user.pk).annotate(
+        **stats
+    ).values_list(*stats).first()
+    return '-'.join(map(str, values))
+
+
+def conditional_recipes_response(request, queryset, total=None):
+    """Валидаторы ETag / Last-Modified для рецептов из queryset.
+
+    Строятся по updated_at, числу рецептов и версии рецептов: её меняют
+    сигналы при правке тегов, ингредиентов и авторов, которые updated_at
+    не трогают. Для авторизованного пользователя добавляется версия его
+    избранного, корзины и подписок. Если число рецептов уже известно,
+    оно передаётся в total.
+    Возвращает (etag, last_modified, ответ 304 или None).
+    """
+
+    aggregates = {'updated': Max('updated_at')}
+    if total is None:
+        aggregates['total'] = Count('pk')
+    state = {'total': total, **queryset.order_by().aggregate(**aggregates)}
+    version = (f'{get_recipes_version()}-{state["updated"]}-'
+               f'{state["total"]}-{user_state_version(request.user)}')
+    etag = quote_etag(hashlib.md5(version.encode()).hexdigest())
+    last_modified = None
+    if not request.user.is_authenticated and state['updated']:
+        last_modified = int(max(
+            state['updated'].timestamp(), get_recipes_changed() or 0
+        ))
+    return etag, last_modified, get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def recipe_amounts(recipe):
+    """Количество каждого ингредиента рецепта: {id ингредиента: amount}."""
+
+    return dict(
+        IngredientInRecipesAmount.objects.filter(
+            recipe=recipe
+        ).values_list('ingredient_id', 'amount')
+    )
+
+
+def total_amounts(recipe_ids, sign=1):
+    """Суммарное количество ингредиентов рецептов одним запросом."""
+
+    totals = {}
+    for ingredient_id, amount in IngredientInRecipesAmount.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount'):
+        totals[ingredient_id] = totals.get(ingredient_id, 0) + sign * amount
+    return totals
+
+
+def update_shopping_lists(user_ids, deltas):
+    """Применение изменений количеств к спискам покупок пользователей.
+
+    deltas — словарь {id ингредиента: изменение количества}. Строки
+    пользователей блокируются, поэтому параллельные изменения корзины
+    одного пользователя выполняются последовательно. Вызывать внутри
+    той же транзакции, что и изменение корзины или рецепта.
+    """
+
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not user_ids or not deltas:
+        return
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(
+            pk__in=user_ids
+        ).order_by('pk').values_list('pk', flat=True))
+        items = {
+            (item.user_id, item.ingredient_id): item
+            for item in ShoppingListIngredient.objects.filter(
+                user_id__in=user_ids, ingredient_id__in=deltas
+            )
+        }
+        to_create, to_update, to_delete = [], [], []
+        for user_id in user_ids:
+            for ingredient_id, delta in deltas.items():
+                item = items.get((user_id, ingredient_id))
+                if item is None:
+                    if delta > 0:
+                        to_create.append(ShoppingListIngredient(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            amount=delta,
+                        ))
+                    continue
+                item.amount += delta
+                if item.amount > 0:
+                    to_update.append(item)
+                else:
+                    to_delete.append(item.pk)
+        ShoppingListIngredient.objects.bulk_create(to_create)
+        ShoppingListIngredient.objects.bulk_update(to_update, ('amount',))
+        ShoppingListIngredient.objects.filter(pk__in=to_delete).delete()
+
+
+def cart_users(recipe_ids):
+    """Пользователи, у которых рецепты лежат в корзине, по возрастанию id."""
+    return list(ShoppingCart.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('user_id').values_list('user_id', flat=True).distinct())
+
+
+@contextmanager
+def recipes_changing(recipe_ids):
+    """
+    Перенос изменений состава рецептов внутри блока в списки покупок.
+
+    Количества ингредиентов читаются до и после блока, разница
+    применяется к спискам всех, у кого рецепт в корзине. Нужен там, где
+    ингредиенты правятся не через API, например в админке.
+    """
+    with transaction.atomic():
+        before = {
+            recipe_id: recipe_amounts(recipe_id) for recipe_id in recipe_ids
+        }
+        yield
+        for recipe_id, amounts in before.items():
+            deltas = recipe_amounts(recipe_id)
+            for ingredient_id, amount in amounts.items():
+                deltas[ingredient_id] = deltas.get(ingredient_id, 0) - amount
+            update_shopping_lists(cart_users([recipe_id]), deltas)
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_cart_txt(ingredients):
+    yield 'Список покупок: \n'
     for ingredient in ingredients:
-        shopping_list += (
+        yield (
             f'{ingredient["ingredient__name"]} - '
             f'{ingredient["amount_sum"]} '
             f'({ingredient["ingredient__measurement_unit"]}) \n'
         )
-        response = HttpResponse(
-            shopping_list, content_type='text/plain; charset=utf8'
-        )
-        response[
-            'Content-Disposition'
-        ] = 'attachment; filename="shopping_cart.txt"'
+
+
+def shopping_cart_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['amount_sum'],
+            ingredient['ingredient__measurement_unit'],
+        ))
+
+
+def shopping_cart_json(ingredients):
+    separator = ''
+    yield '['
+    for ingredient in ingredients:
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'amount': ingredient['amount_sum'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+SHOPPING_CART_WRITERS = {
+    'txt': shopping_cart_txt,
+    'csv': shopping_cart_csv,
+    'json': shopping_cart_json,
+}
+
+
+def shopping_cart_file(ingredients, file_format='txt'):
+    """Потоковая загрузка списка покупок с ингредиентами.
+
+    Строки читаются из базы порциями через iterator() и сразу
+    отдаются клиенту, поэтому память не зависит от размера корзины.
+    """
+
+    rows = ingredients.iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE)
+    response = StreamingHttpResponse(
+        SHOPPING_CART_WRITERS[file_format](rows),
+        content_type=SHOPPING_CART_CONTENT_TYPES[file_format],
+    )
+    response[
+        'Content-Disposition'
+    ] = f'attachment; filename="shopping_cart.{file_format}"'
     return response
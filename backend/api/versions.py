@@ -0,0 +1,35 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+RECIPES_VERSION_KEY = 'recipes:version'
+RECIPES_CHANGED_KEY = 'recipes:changed'
+
+
+def get_recipes_version():
+    """Текущая версия данных рецептов."""
+    return cache.get_or_set(RECIPES_VERSION_KEY, 1, timeout=None)
+
+
+def get_recipes_changed():
+    """Время последней смены версии (timestamp) или None."""
+    return cache.get(RECIPES_CHANGED_KEY)
+
+
+def _bump_recipes_version():
+    try:
+        cache.incr(RECIPES_VERSION_KEY)
+    except ValueError:
+        cache.set(RECIPES_VERSION_KEY, 1, timeout=None)
+    cache.set(RECIPES_CHANGED_KEY, timezone.now().timestamp(), timeout=None)
+
+
+def bump_recipes_version():
+    """
+    Смена версии данных рецептов после фиксации их изменения.
+
+    Версия хранится в общем для всех процессов кэше default. Если сменить
+    её до фиксации, другой процесс успеет сохранить ответ по старым
+    данным уже под новой версией.
+    """
+    transaction.on_commit(_bump_recipes_version)
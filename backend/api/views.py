@@ -1,25 +1,50 @@
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Subquery, Value)
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from foodgram.middleware import measure
 from recipes.models import (FavoriteReceipe, Ingredient,
                             IngredientInRecipesAmount, Recipe, ShoppingCart,
-                            Tag)
+                            ShoppingListIngredient, Tag)
 from users.models import Follow, User
 
-from .filters import IngredientFilter, RecipeFilter
-from .pagination import LimitPaginator
+from .bulk import (add_recipes, bulk_add, bulk_remove, clear_cart,
+                   remove_recipes)
+from .feed import backfill_feed, feed_sources, prune_feed
+from .filters import (RECIPE_ORDERINGS, IngredientFilter, RecipeFilter,
+                      depends_on_counters)
+from .ingredient_index import ingredient_index
+from .pagination import FeedPaginator, LimitPaginator, RecipePaginator
+from .parsers import MultiPartJSONParser
 from .permission import OwnerOrReadOnly
+from .renderers import CSVRenderer, PlainTextRenderer
+from .response_cache import cached_response
 from .serializers import (FollowSerializer, IngredientSerializer,
-                          RecipesReadSerializer, RecipesWriteSerializer,
+                          RecipeIdsSerializer, RecipesReadSerializer,
+                          RecipesWriteSerializer,
                           ShoppingListFavoiriteSerializer, TagSerializer,
                           UserSerializer)
-from .utils import shopping_cart_file
+from .tag_registry import tag_registry
+from .utils import (conditional_recipes_response, set_validators,
+                    shopping_cart_file)
+
+
+def serialized(serializer):
+    """Данные сериализатора; время учитывается в метриках запроса."""
+    with measure('serialize'):
+        return serializer.data
 
 
 class TagsViewSet(viewsets.ModelViewSet):
@@ -28,6 +53,26 @@ class TagsViewSet(viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
+    def list(self, request, *args, **kwargs):
+        snapshot = tag_registry.get()
+        etag = quote_etag(snapshot.etag)
+        last_modified = int(snapshot.last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = Response(snapshot.data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            tag = tag_registry.get().by_id[int(kwargs['pk'])]
+        except (KeyError, ValueError):
+            raise Http404
+        return Response(tag)
+
 
 class IngredientsViewSet(viewsets.ModelViewSet):
     """Класс взаимодействия с Ingredients. Вьюсет для ингредиентов."""
@@ -36,6 +81,12 @@ class IngredientsViewSet(viewsets.ModelViewSet):
     filter_backends = [IngredientFilter]
     search_fields = ('^name', )
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get(IngredientFilter.search_param)
+        if not name:
+            return super().list(request, *args, **kwargs)
+        return Response(ingredient_index.search(name))
+
 
 class UsersViewSet(UserViewSet):
     """Класс взаимодействия с Users. Вьюсет для пользователя."""
@@ -50,7 +101,7 @@ class UsersViewSet(UserViewSet):
     )
     def me(self, request):
         serializer = self.get_serializer(request.user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serialized(serializer), status=status.HTTP_200_OK)
 
     @action(
         methods=['GET'], detail=False,
@@ -59,12 +110,28 @@ class UsersViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = self.request.user
-        queryset = Follow.objects.filter(user=user)
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'renditions', 'cooking_time',
+            'author_id'
+        )
+        recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).order_by('-pub_date').values('pk')[:int(recipes_limit)]
+            ))
+        queryset = Follow.objects.filter(user=user).select_related(
+            'author'
+        ).order_by('-pk').prefetch_related(
+            Prefetch('author__recipes', queryset=recipes,
+                     to_attr='recipes_preview')
+        )
         page = self.paginate_queryset(queryset)
         serializer = FollowSerializer(
             page, many=True, context={'request': request}
         )
-        return self.get_paginated_response(serializer.data)
+        return self.get_paginated_response(serialized(serializer))
 
     @action(
         methods=['POST', 'DELETE'], detail=True,
@@ -74,14 +141,21 @@ class UsersViewSet(UserViewSet):
         user = request.user
         author = get_object_or_404(User, id=id)
         if request.method == 'POST':
+            with transaction.atomic():
+                follow = Follow.objects.create(user=user, author=author)
+                backfill_feed(user, author)
             serializer = FollowSerializer(
-                Follow.objects.create(user=user, author=author),
-                context={'request': request},
+                follow, context={'request': request},
             )
             return Response(
-                serializer.data, status=status.HTTP_201_CREATED
+                serialized(serializer), status=status.HTTP_201_CREATED
             )
-        Follow.objects.filter(user=user, author=author).delete()
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(
+                user=user, author=author
+            ).delete()
+            if deleted:
+                prune_feed(user, author)
         return Response('Успешная отписка', status=status.HTTP_204_NO_CONTENT)
 
 
@@ -92,7 +166,92 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
     permission_class = (OwnerOrReadOnly,)
-    pagination_class = LimitPaginator
+    pagination_class = RecipePaginator
+    parser_classes = (JSONParser, MultiPartJSONParser)
+
+    @property
+    def cursor_ordering(self):
+        return RECIPE_ORDERINGS.get(
+            self.request.query_params.get('ordering'),
+            RECIPE_ORDERINGS['newest'],
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe',
+                queryset=IngredientInRecipesAmount.objects.select_related(
+                    'ingredient'
+                ),
+            ),
+        )
+        user = self.request.user
+        if user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Exists(FavoriteReceipe.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+                is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+            )
+        return queryset.annotate(
+            is_favorited=Value(False, output_field=BooleanField()),
+            is_in_shopping_cart=Value(False, output_field=BooleanField()),
+        )
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, lambda: self.build_list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(
+            request, lambda: self.build_retrieve(request, *args, **kwargs)
+        )
+
+    def build_list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = last_modified = response = None
+        # Валидаторы опираются на число рецептов, поэтому не строятся,
+        # когда оно не считается (курсор) или известно лишь приближённо,
+        # а также для выдачи, зависящей от счётчиков избранного.
+        if not (self.paginator.is_cursor_request(request)
+                or depends_on_counters(request.query_params)):
+            count, estimated = self.paginator.get_count(queryset, request)
+            if not estimated:
+                etag, last_modified, response = (
+                    conditional_recipes_response(request, queryset, count)
+                )
+        if response is None:
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                response = self.get_paginated_response(
+                    serialized(serializer)
+                )
+            else:
+                serializer = self.get_serializer(queryset, many=True)
+                response = Response(serialized(serializer))
+        if etag is None:
+            return response
+        return set_validators(response, etag, last_modified)
+
+    def build_retrieve(self, request, *args, **kwargs):
+        try:
+            queryset = self.get_queryset().filter(pk=int(kwargs['pk']))
+        except ValueError:
+            raise Http404
+        etag, last_modified, response = conditional_recipes_response(
+            request, queryset
+        )
+        if response is None:
+            serializer = self.get_serializer(self.get_object())
+            response = Response(serialized(serializer))
+        return set_validators(response, etag, last_modified)
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -100,37 +259,36 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return RecipesWriteSerializer
 
     def post_delete_recipe(self, request, pk, model):
-        recipe = get_object_or_404(Recipe, pk=pk)
+        """
+        Добавление и удаление одного рецепта.
+
+        Решение принимается по числу строк, затронутых одной командой
+        INSERT ... ON CONFLICT DO NOTHING или DELETE, поэтому повторные
+        и параллельные запросы получают 400, а не ошибку целостности.
+        """
         user = self.request.user
         if request.method == 'POST':
-            serializer = ShoppingListFavoiriteSerializer(recipe)
-            if model.objects.filter(
-                    user=user, recipe=recipe
-            ).exists():
+            recipe = get_object_or_404(Recipe, pk=pk)
+            if not add_recipes(user, model, [recipe.pk]):
                 return Response(
                     {'errors': 'Рецепт уже добавлен!'},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            else:
-                model.objects.create(
-                    user=user, recipe=recipe
-                )
-                return Response(
-                    serializer.data,
-                    status=status.HTTP_201_CREATED)
-        elif request.method == 'DELETE':
-            if model.objects.filter(
-                user=user, recipe=recipe
-            ).exists():
-                model.objects.get(
-                    user=user, recipe=recipe
-                ).delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            else:
-                return Response(
-                    {'errors': 'Рецепт уже удален!'},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+            serializer = ShoppingListFavoiriteSerializer(recipe)
+            return Response(
+                serialized(serializer), status=status.HTTP_201_CREATED
+            )
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        if remove_recipes(user, model, [recipe_id]):
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(Recipe, pk=recipe_id)
+        return Response(
+            {'errors': 'Рецепт уже удален!'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
     @action(
         methods=['POST', 'DELETE'], detail=True,
@@ -147,20 +305,63 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.post_delete_recipe(
             request, kwargs.pop('pk'), ShoppingCart)
 
+    def bulk_recipes(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        change = bulk_add if request.method == 'POST' else bulk_remove
+        return Response({'recipes': change(
+            request.user, model, serializer.validated_data['recipes']
+        )})
+
+    @action(
+        methods=['POST', 'DELETE'], detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='favorite/bulk', url_name='favorite-bulk',
+    )
+    def favorite_bulk(self, request):
+        return self.bulk_recipes(request, FavoriteReceipe)
+
+    @action(
+        methods=['POST', 'DELETE'], detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_cart/bulk', url_name='shopping-cart-bulk',
+    )
+    def shopping_cart_bulk(self, request):
+        return self.bulk_recipes(request, ShoppingCart)
+
+    @action(
+        methods=['DELETE'], detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_cart', url_name='shopping-cart-clear',
+    )
+    def clear_shopping_cart(self, request):
+        return Response({'recipes': clear_cart(request.user)})
+
     @action(
         methods=['GET'], detail=False,
-        permission_class=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedPaginator,
     )
-    def download_shopping_cart(self, request):
-        ingredients = IngredientInRecipesAmount.objects.select_related(
-            'recipe', 'ingredient'
+    def feed(self, request):
+        page = self.paginator.paginate_sources(
+            feed_sources(request.user), self.get_queryset(), request
         )
-        ingredients = ingredients.filter(
-            recipe__shopping_recipes__user=request.user
-        )
-        ingredients = ingredients.values(
-            'ingredient__name', 'ingredient__measurement_unit'
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serialized(serializer))
+
+    @action(
+        methods=['GET'], detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, JSONRenderer),
+    )
+    def download_shopping_cart(self, request):
+        ingredients = ShoppingListIngredient.objects.filter(
+            user=request.user
+        ).values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            amount_sum=F('amount'),
+        ).order_by('ingredient__name')
+        return shopping_cart_file(
+            ingredients, request.accepted_renderer.format
         )
-        ingredients = ingredients.annotate(amount_sum=Sum('amount'))
-        ingredients = ingredients.order_by('ingredient__name')
-        return shopping_cart_file(ingredients)
@@ -0,0 +1,172 @@
+import json
+import logging
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('foodgram.requests')
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса; подключается как execute_wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.timings = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Повторы одного и того же SQL с разными параметрами (N+1)."""
+        return sum(
+            count - 1 for count in self.statements.values() if count > 1
+        )
+
+
+@contextmanager
+def measure(name):
+    """
+    Учёт времени блока в метриках текущего запроса.
+
+    Без активного RequestMetricsMiddleware ничего не делает.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += perf_counter() - start
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 2)
+
+
+class RequestMetricsMiddleware:
+    """
+    Число SQL-запросов, время SQL и сериализации каждого запроса.
+
+    Метрики отдаются в заголовке Server-Timing и пишутся строкой JSON
+    в журнал foodgram.requests, у потоковых ответов — только в журнал
+    после отдачи тела; запросы сверх порогов REQUEST_METRICS_* помечаются
+    и пишутся с уровнем WARNING. При выключенной настройке
+    REQUEST_METRICS_ENABLED Django исключает middleware из цепочки.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        start = perf_counter()
+        with self.collect(metrics):
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, response, metrics, start
+            )
+            return response
+        total = perf_counter() - start
+        response['Server-Timing'] = self.server_timing(metrics, total)
+        self.log(request, response, metrics, total)
+        return response
+
+    @contextmanager
+    def collect(self, metrics):
+        """Учёт SQL-запросов и блоков measure() внутри блока with."""
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                yield
+        finally:
+            current_metrics.reset(token)
+
+    def stream(self, content, request, response, metrics, start):
+        """
+        Тело потокового ответа с учётом запросов при его отдаче.
+
+        Тело читается уже после выхода из middleware, поэтому учёт
+        включается на время получения каждой части, а запись в журнал
+        делается, когда тело отдано. Заголовки отправляются раньше тела,
+        поэтому Server-Timing у потоковых ответов не ставится.
+        """
+        chunks = iter(content)
+        try:
+            while True:
+                with self.collect(metrics):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.log(request, response, metrics, perf_counter() - start)
+
+    def server_timing(self, metrics, total):
+        parts = [
+            f'db;dur={milliseconds(metrics.sql_time)};'
+            f'desc="{metrics.queries} queries, '
+            f'{metrics.duplicates} duplicates"',
+        ]
+        parts.extend(
+            f'{name};dur={milliseconds(duration)}'
+            for name, duration in metrics.timings.items()
+        )
+        parts.append(f'total;dur={milliseconds(total)}')
+        return ', '.join(parts)
+
+    def flags(self, metrics, total):
+        """Превышенные пороги."""
+        limits = (
+            ('slow', milliseconds(total),
+             settings.REQUEST_METRICS_SLOW_MS),
+            ('queries', metrics.queries,
+             settings.REQUEST_METRICS_MAX_QUERIES),
+            ('duplicates', metrics.duplicates,
+             settings.REQUEST_METRICS_MAX_DUPLICATES),
+        )
+        return [name for name, value, limit in limits if value > limit]
+
+    def log(self, request, response, metrics, total):
+        flags = self.flags(metrics, total)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'duplicates': metrics.duplicates,
+            'sql_ms': milliseconds(metrics.sql_time),
+            **{
+                f'{name}_ms': milliseconds(duration)
+                for name, duration in metrics.timings.items()
+            },
+            'total_ms': milliseconds(total),
+            'flags': flags,
+        }
+        logger.log(
+            logging.WARNING if flags else logging.INFO,
+            json.dumps(record, ensure_ascii=False),
+        )
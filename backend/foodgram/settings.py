@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_filters',
     'rest_framework',
     'rest_framework.authtoken',
@@ -30,10 +31,12 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
+    'tasks.apps.TasksConfig',
     'colorfield',
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -105,6 +108,36 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Версия рецептов хранится в default, ответы — в responses. Кэш default
+# общий для веб-процессов и обработчика задач (по умолчанию таблица в базе,
+# создаётся командой createcachetable); без DEBUG это проверяется при
+# запуске. Ответы хранятся под версией, поэтому responses может оставаться
+# в памяти процесса.
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.db.DatabaseCache',
+        ),
+        'LOCATION': config('CACHE_LOCATION', default='foodgram_cache'),
+    },
+    'responses': {
+        'BACKEND': config(
+            'RESPONSE_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': config(
+            'RESPONSE_CACHE_LOCATION', default='foodgram-responses'
+        ),
+        'TIMEOUT': config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config(
+                'RESPONSE_CACHE_MAX_ENTRIES', default=5000, cast=int
+            ),
+        },
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
@@ -140,3 +173,73 @@ DJOSER = {
 }
 
 ZERO_MIN_VALUE = 0
+
+INGREDIENT_INDEX_TTL = config('INGREDIENT_INDEX_TTL', default=300, cast=int)
+
+TAG_REGISTRY_TTL = config('TAG_REGISTRY_TTL', default=60, cast=int)
+
+RECIPES_COUNT_ESTIMATE_THRESHOLD = config(
+    'RECIPES_COUNT_ESTIMATE_THRESHOLD', default=10000, cast=int
+)
+RECIPES_COUNT_CACHE_TIMEOUT = config(
+    'RECIPES_COUNT_CACHE_TIMEOUT', default=30, cast=int
+)
+
+RECIPES_RESPONSE_CACHE = 'responses'
+
+RECIPE_IMAGE_MAX_SIZE = config(
+    'RECIPE_IMAGE_MAX_SIZE', default=20 * 1024 * 1024, cast=int
+)
+
+TASK_QUEUES = {
+    'default': config('TASK_DEFAULT_CONCURRENCY', default=2, cast=int),
+    'renditions': config('TASK_RENDITIONS_CONCURRENCY', default=2, cast=int),
+}
+
+ADMIN_COUNT_ESTIMATE_THRESHOLD = config(
+    'ADMIN_COUNT_ESTIMATE_THRESHOLD', default=10000, cast=int
+)
+
+FEED_FANOUT_MAX_FOLLOWERS = config(
+    'FEED_FANOUT_MAX_FOLLOWERS', default=10000, cast=int
+)
+FEED_BACKFILL_SIZE = config('FEED_BACKFILL_SIZE', default=100, cast=int)
+
+BULK_RECIPES_MAX_SIZE = config(
+    'BULK_RECIPES_MAX_SIZE', default=10000, cast=int
+)
+
+REQUEST_METRICS_ENABLED = config(
+    'REQUEST_METRICS_ENABLED', default=False, cast=bool
+)
+REQUEST_METRICS_SLOW_MS = config(
+    'REQUEST_METRICS_SLOW_MS', default=500, cast=float
+)
+REQUEST_METRICS_MAX_QUERIES = config(
+    'REQUEST_METRICS_MAX_QUERIES', default=30, cast=int
+)
+REQUEST_METRICS_MAX_DUPLICATES = config(
+    'REQUEST_METRICS_MAX_DUPLICATES', default=5, cast=int
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.requests': {
+            'handlers': ['console'],
+            'level': config('REQUEST_METRICS_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+        'tasks': {
+            'handlers': ['console'],
+            'level': config('TASKS_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
@@ -1,5 +1,9 @@
 from django.contrib import admin
 
+from api.admin_tools import ScalableAdmin, autocomplete_filter
+from api.bulk import remove_marks
+from api.utils import recipes_changing
+
 from .models import (FavoriteReceipe, Ingredient, IngredientInRecipesAmount,
                      Recipe, ShoppingCart, Tag)
 
@@ -7,12 +11,11 @@ EMPTY_VALUE = '-пусто-'
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(ScalableAdmin):
     """Админ панель управления ингредиентами."""
 
     list_display = ('name', 'measurement_unit')
-    search_fields = ('name',)
-    list_filter = ('name',)
+    search_fields = ('^name',)
     ordering = ('name',)
 
 
@@ -27,10 +30,31 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(IngredientInRecipesAmount)
-class AmountIngredientAdmin(admin.ModelAdmin):
+class AmountIngredientAdmin(ScalableAdmin):
     """Отображение ингредиентов в админке."""
 
     list_display = ('amount', 'ingredient', 'recipe')
+    list_select_related = ('ingredient', 'recipe__author')
+    list_filter = (
+        autocomplete_filter('recipe'),
+        autocomplete_filter('ingredient'),
+    )
+    autocomplete_fields = ('ingredient', 'recipe')
+
+    def save_model(self, request, obj, form, change):
+        # Строку могли перенести в другой рецепт: меняются оба.
+        recipe_ids = {obj.recipe_id, form.initial.get('recipe')} - {None}
+        with recipes_changing(recipe_ids):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with recipes_changing([obj.recipe_id]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        with recipes_changing(recipe_ids):
+            super().delete_queryset(request, queryset)
 
 
 class IngredientInRecipesAmountInline(admin.TabularInline):
@@ -39,38 +63,69 @@ class IngredientInRecipesAmountInline(admin.TabularInline):
     model = IngredientInRecipesAmount
     extra = 1
     min_num = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(ScalableAdmin):
     """Админ панель управления рецептами."""
 
     list_display = ('name', 'author', 'get_in_favorites')
+    list_select_related = ('author',)
     list_filter = (
-        'name',
-        'author',
+        autocomplete_filter('author'),
         'tags',
     )
+    search_fields = ('name',)
+    autocomplete_fields = ('author',)
     inlines = (IngredientInRecipesAmountInline,)
     empty_value_display = EMPTY_VALUE
 
+    def get_queryset(self, request):
+        # Автор входит в строковое представление рецепта, в том числе
+        # в ответах автодополнения.
+        return super().get_queryset(request).select_related('author')
+
+    def save_related(self, request, form, formsets, change):
+        # Ингредиенты из формы попадают и в списки покупок.
+        with recipes_changing([form.instance.pk]):
+            super().save_related(request, form, formsets, change)
+
+    @admin.display(description='В избранном', ordering='favorites_count')
     def get_in_favorites(self, obj):
-        return obj.favorite_recipes.count()
+        return obj.favorites_count
+
+
+class MarkAdmin(ScalableAdmin):
+    """Удаление избранного и корзины со счётчиками и списком покупок."""
+
+    def delete_model(self, request, obj):
+        remove_marks(self.model, [(obj.user_id, obj.recipe_id)])
+
+    def delete_queryset(self, request, queryset):
+        remove_marks(self.model, queryset.values_list('user_id', 'recipe_id'))
 
 
 @admin.register(FavoriteReceipe)
-class FavoriteReceipeAdmin(admin.ModelAdmin):
+class FavoriteReceipeAdmin(MarkAdmin):
     """Админ панель управления подписками."""
     list_display = ('user', 'recipe',)
-    list_filter = ('user', 'recipe',)
-    search_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe__author')
+    list_filter = (autocomplete_filter('user'), autocomplete_filter('recipe'))
+    search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
     empty_value_display = EMPTY_VALUE
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(MarkAdmin):
     """Админ панель списка покупок."""
     list_display = ('user', 'recipe',)
-    list_filter = ('user', 'recipe',)
-    search_fields = ('user',)
+    list_select_related = ('user', 'recipe__author')
+    list_filter = (autocomplete_filter('user'), autocomplete_filter('recipe'))
+    search_fields = ('user__username',)
+    autocomplete_fields = ('user', 'recipe')
     empty_value_display = EMPTY_VALUE
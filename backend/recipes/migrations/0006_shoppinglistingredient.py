@@ -0,0 +1,63 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+BATCH_SIZE = 5000
+
+
+def fill_shopping_lists(apps, schema_editor):
+    """Суммы ингредиентов по корзинам, которые уже есть в базе."""
+    IngredientInRecipesAmount = apps.get_model(
+        'recipes', 'IngredientInRecipesAmount'
+    )
+    ShoppingListIngredient = apps.get_model(
+        'recipes', 'ShoppingListIngredient'
+    )
+    rows = IngredientInRecipesAmount.objects.filter(
+        recipe__shopping_recipes__isnull=False
+    ).values(
+        'recipe__shopping_recipes__user', 'ingredient'
+    ).annotate(total=Sum('amount')).order_by()
+    batch = []
+    for row in rows.iterator():
+        batch.append(ShoppingListIngredient(
+            user_id=row['recipe__shopping_recipes__user'],
+            ingredient_id=row['ingredient'],
+            amount=row['total'],
+        ))
+        if len(batch) == BATCH_SIZE:
+            ShoppingListIngredient.objects.bulk_create(batch)
+            batch = []
+    ShoppingListIngredient.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0005_alter_tag_color'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(help_text='Суммарное количество ингредиента по рецептам в корзине', verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списках покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_ingredient'),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
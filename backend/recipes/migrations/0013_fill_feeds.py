@@ -0,0 +1,61 @@
+# Generated by Django 3.2.16 on 2026-10-18 21:05
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+AUTHORS_BATCH_SIZE = 500
+
+
+def fill_authors_feeds(apps, author_ids):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    Follow = apps.get_model('users', 'Follow')
+    latest = {author_id: [] for author_id in author_ids}
+    recipes = Recipe.objects.filter(author_id__in=author_ids).order_by(
+        'author_id', '-pub_date', '-pk'
+    ).values_list('author_id', 'pk', 'pub_date')
+    for author_id, recipe_id, pub_date in recipes.iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        if len(latest[author_id]) < settings.FEED_BACKFILL_SIZE:
+            latest[author_id].append((recipe_id, pub_date))
+    follows = Follow.objects.filter(author_id__in=author_ids).values_list(
+        'user_id', 'author_id'
+    )
+    batch = []
+    for user_id, author_id in follows.iterator(chunk_size=BATCH_SIZE):
+        batch.extend(
+            FeedEntry(user_id=user_id, author_id=author_id,
+                      recipe_id=recipe_id, pub_date=pub_date)
+            for recipe_id, pub_date in latest[author_id]
+        )
+        if len(batch) >= BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fill_feeds(apps, schema_editor):
+    """Ленты по подпискам, которые уже есть в базе."""
+    User = apps.get_model('users', 'User')
+    author_ids = list(User.objects.filter(
+        followers_count__gt=0,
+        followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(author_ids), AUTHORS_BATCH_SIZE):
+        fill_authors_feeds(
+            apps, author_ids[start:start + AUTHORS_BATCH_SIZE]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_feedentry'),
+        ('users', '0004_user_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
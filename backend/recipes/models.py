@@ -1,4 +1,6 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
@@ -10,6 +12,14 @@ from foodgram.global_constants import (INGREDIENT_NAME_LENGTH, MAXLENGTH,
 from users.models import User
 
 
+def normalize_name(value):
+    """
+    Название ингредиента или единицы измерения в том виде, в котором оно
+    хранится: нижний регистр, пробелы по краям и повторные пробелы убраны.
+    """
+    return ' '.join(value.split()).lower()
+
+
 class Tag(models.Model):
     """Модель тэгов."""
 
@@ -90,8 +100,8 @@ class Ingredient(models.Model):
                 f'({self.measurement_unit[:MAXLENGTH]}).')
 
     def clean(self):
-        self.name = self.name.lower()
-        self.measurement_unit = self.measurement_unit.lower()
+        self.name = normalize_name(self.name)
+        self.measurement_unit = normalize_name(self.measurement_unit)
         super().clean()
 
 
@@ -143,6 +153,32 @@ class Recipe(models.Model):
         auto_now_add=True,
         editable=False,
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    renditions = models.JSONField(
+        'Варианты картинки',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+    )
+    carts_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -154,6 +190,25 @@ class Recipe(models.Model):
                 name='unique_name_author'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=('-favorites_count', '-id'),
+                name='recipe_favorites_count_idx',
+            ),
+            GinIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_gin',
+            ),
+            GinIndex(
+                fields=('name',),
+                name='recipe_name_trgm_gin',
+                opclasses=('gin_trgm_ops',),
+            ),
+        ]
 
     def __str__(self):
         return f'{self.author}, автор {self.name}'
@@ -274,3 +329,87 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'Добавлено в корзину {self.recipe}'
+
+
+class ShoppingListIngredient(models.Model):
+    """Модель суммарного количества ингредиента в списке покупок."""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+    )
+    amount = models.PositiveIntegerField(
+        'Количество',
+        help_text='Суммарное количество ингредиента по рецептам в корзине',
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_ingredient',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} ({self.amount}) у {self.user}'
+
+
+class FeedEntry(models.Model):
+    """Модель записи в ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Читатель',
+        on_delete=models.CASCADE,
+        related_name='feed',
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    pub_date = models.DateTimeField(
+        'Дата публикации',
+        help_text='Копия даты публикации рецепта для сортировки ленты',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_user_author_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
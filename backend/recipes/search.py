@@ -0,0 +1,60 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery
+
+from recipes.models import IngredientInRecipesAmount, Recipe
+
+SEARCH_CONFIG = 'russian'
+
+
+def uses_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+def update_search_vectors(recipe_ids):
+    """Пересчёт поискового вектора рецептов одним запросом UPDATE.
+
+    Название имеет наибольший вес, затем описание и названия
+    ингредиентов.
+    """
+
+    if not uses_postgresql():
+        return
+    ingredient_names = IngredientInRecipesAmount.objects.filter(
+        recipe=OuterRef('pk')
+    ).values('recipe').annotate(
+        names=StringAgg('ingredient__name', delimiter=' ')
+    ).values('names')
+    Recipe.objects.filter(pk__in=recipe_ids).update(search_vector=(
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Subquery(ingredient_names), weight='C',
+                       config=SEARCH_CONFIG)
+    ))
+
+
+def search_recipes(queryset, value):
+    """Поиск рецептов по названию, описанию и ингредиентам.
+
+    В PostgreSQL используется полнотекстовый поиск по search_vector и
+    триграммное сходство названия (оба через GIN-индексы), результаты
+    упорядочены по релевантности. В других СУБД — поиск по подстроке.
+    """
+
+    if not uses_postgresql():
+        return queryset.filter(
+            Q(name__icontains=value)
+            | Q(text__icontains=value)
+            | Q(ingredients__name__icontains=value)
+        ).distinct()
+    query = SearchQuery(value, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.filter(
+        Q(search_vector=query) | Q(name__trigram_similar=value)
+    ).annotate(
+        search_rank=(
+            SearchRank(F('search_vector'), query)
+            + TrigramSimilarity('name', value)
+        )
+    ).order_by('-search_rank', '-pub_date')
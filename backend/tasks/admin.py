@@ -0,0 +1,22 @@
+from django.contrib import admin
+
+from .models import Task
+from .queue import requeue_failed
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Просмотр фоновых задач в админке."""
+
+    list_display = ('id', 'name', 'queue', 'status', 'attempts', 'run_at',
+                    'worker')
+    list_filter = ('queue', 'status')
+    search_fields = ('name',)
+    readonly_fields = ('locked_until', 'worker', 'last_error', 'created_at')
+    actions = ('requeue',)
+
+    @admin.action(description='Повторить задачи с ошибкой')
+    def requeue(self, request, queryset):
+        self.message_user(
+            request, f'Возвращено в очередь: {requeue_failed(queryset)}.'
+        )
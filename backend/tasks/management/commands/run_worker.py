@@ -0,0 +1,48 @@
+import signal
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from tasks.worker import Worker
+
+
+def parse_queues(values):
+    """Очереди вида name или name:concurrency, по умолчанию из настроек."""
+    if not values:
+        return dict(settings.TASK_QUEUES)
+    queues = {}
+    for value in values:
+        name, _, concurrency = value.partition(':')
+        try:
+            queues[name] = int(
+                concurrency or settings.TASK_QUEUES.get(name, 1)
+            )
+        except ValueError:
+            raise CommandError(f'Неверное число потоков: {value}.')
+    return queues
+
+
+class Command(BaseCommand):
+    """Выполнить команду python manage.py run_worker."""
+
+    help = ('Обработчик фоновых задач. Очереди задаются как name или '
+            'name:concurrency, по умолчанию берутся из TASK_QUEUES.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('queues', nargs='*')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--burst', action='store_true',
+                            help='Завершиться, когда очереди опустеют.')
+
+    def handle(self, *args, **options):
+        queues = parse_queues(options['queues'])
+        worker = Worker(queues, options['poll_interval'])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработчик {worker.name}: ' + ', '.join(
+                f'{name} x{concurrency}'
+                for name, concurrency in queues.items()
+            )
+        ))
+        worker.run(burst=options['burst'])
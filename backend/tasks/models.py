@@ -0,0 +1,93 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Фоновая задача в очереди."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    queue = models.CharField(
+        'Очередь',
+        max_length=50,
+        default='default',
+    )
+    name = models.CharField(
+        'Функция',
+        max_length=200,
+    )
+    args = models.JSONField(
+        'Аргументы',
+        default=list,
+        blank=True,
+    )
+    kwargs = models.JSONField(
+        'Именованные аргументы',
+        default=dict,
+        blank=True,
+    )
+    status = models.CharField(
+        'Состояние',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Попыток',
+        default=0,
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток',
+        default=3,
+    )
+    timeout = models.PositiveIntegerField(
+        'Время на выполнение, сек',
+        default=300,
+    )
+    retry_delay = models.PositiveIntegerField(
+        'Задержка перед повтором, сек',
+        default=10,
+    )
+    run_at = models.DateTimeField(
+        'Запуск не раньше',
+        default=timezone.now,
+    )
+    locked_until = models.DateTimeField(
+        'Занята до',
+        null=True,
+        blank=True,
+    )
+    worker = models.CharField(
+        'Обработчик',
+        max_length=100,
+        blank=True,
+    )
+    last_error = models.TextField(
+        'Последняя ошибка',
+        blank=True,
+    )
+    created_at = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        ordering = ('run_at', 'id')
+        indexes = [
+            models.Index(
+                fields=('queue', 'status', 'run_at'),
+                name='task_queue_status_run_at_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
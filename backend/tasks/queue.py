@@ -0,0 +1,148 @@
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+DEFAULT_QUEUE = 'default'
+LEASE_GRACE = timedelta(seconds=30)
+
+
+def task(queue=DEFAULT_QUEUE, max_attempts=3, timeout=300, retry_delay=10):
+    """
+    Регистрация функции как фоновой задачи.
+
+    Функция остаётся обычной, а func.enqueue(*args, **kwargs) ставит её
+    вызов в очередь в текущей транзакции.
+    """
+
+    def decorator(func):
+        func.task_options = {
+            'queue': queue,
+            'max_attempts': max_attempts,
+            'timeout': timeout,
+            'retry_delay': retry_delay,
+        }
+        func.enqueue = lambda *args, **kwargs: enqueue(func, *args, **kwargs)
+        return func
+
+    return decorator
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Постановка задачи в очередь.
+
+    Строка пишется в текущей транзакции: при откате задача исчезает
+    вместе с остальными изменениями, а обработчик видит её только после
+    фиксации.
+    """
+    options = func.task_options
+    return Task.objects.create(
+        queue=options['queue'],
+        name=f'{func.__module__}.{func.__qualname__}',
+        args=list(args),
+        kwargs=kwargs,
+        max_attempts=options['max_attempts'],
+        timeout=options['timeout'],
+        retry_delay=options['retry_delay'],
+    )
+
+
+def claim(queue, worker):
+    """
+    Захват следующей задачи очереди.
+
+    Строки, занятые другими обработчиками, пропускаются (SKIP LOCKED).
+    Задача, чей срок выполнения истёк, считается брошенной и выдаётся
+    снова.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        task = Task.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Task.QUEUED)
+            | Q(status=Task.RUNNING, locked_until__lt=now),
+            queue=queue,
+            run_at__lte=now,
+        ).order_by('run_at', 'id').first()
+        if task is None:
+            return None
+        task.status = Task.RUNNING
+        task.attempts += 1
+        task.worker = worker
+        task.locked_until = (
+            now + timedelta(seconds=task.timeout) + LEASE_GRACE
+        )
+        task.save(update_fields=(
+            'status', 'attempts', 'worker', 'locked_until'
+        ))
+    return task
+
+
+def extend_lease(task):
+    """
+    Продление аренды выполняющейся задачи ещё на timeout.
+
+    Поток задачи нельзя прервать, поэтому просроченная задача остаётся
+    за обработчиком, пока поток не завершится, и не выдаётся повторно.
+    Возвращает False, если задачу уже перехватил другой обработчик.
+    """
+    task.locked_until = (
+        timezone.now() + timedelta(seconds=task.timeout) + LEASE_GRACE
+    )
+    return Task.objects.filter(
+        pk=task.pk, status=Task.RUNNING, attempts=task.attempts
+    ).update(locked_until=task.locked_until) > 0
+
+
+def execute(task):
+    """Вызов функции задачи в текущем потоке."""
+    try:
+        import_string(task.name)(*task.args, **task.kwargs)
+    finally:
+        close_old_connections()
+
+
+def finish(task, error=None):
+    """
+    Запись результата задачи.
+
+    Успешная задача удаляется. После ошибки задача возвращается в очередь
+    с нарастающей задержкой, пока не исчерпаны попытки. Результат
+    игнорируется, если задачу уже перехватил другой обработчик.
+    """
+    current = Task.objects.filter(
+        pk=task.pk, status=Task.RUNNING, attempts=task.attempts
+    )
+    if error is None:
+        current.delete()
+        return
+    message = ''.join(traceback.format_exception(
+        type(error), error, error.__traceback__
+    ))
+    if task.attempts < task.max_attempts:
+        current.update(
+            status=Task.QUEUED,
+            locked_until=None,
+            last_error=message,
+            run_at=timezone.now() + timedelta(
+                seconds=task.retry_delay * 2 ** (task.attempts - 1)
+            ),
+        )
+    else:
+        current.update(
+            status=Task.FAILED, locked_until=None, last_error=message
+        )
+
+
+def requeue_failed(queryset):
+    """Повторный запуск задач, завершившихся ошибкой."""
+    return queryset.filter(status=Task.FAILED).update(
+        status=Task.QUEUED,
+        run_at=timezone.now(),
+        max_attempts=F('attempts') + 1,
+    )
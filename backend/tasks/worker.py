@@ -0,0 +1,101 @@
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .queue import LEASE_GRACE, claim, execute, extend_lease, finish
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Обработчик очередей задач.
+
+    Для каждой очереди держит пул потоков на заданное число задач.
+    Поток нельзя прервать, поэтому у задачи, превысившей timeout,
+    продлевается аренда: она занимает место в очереди и не выдаётся
+    другим обработчикам, пока поток не завершится, а результат
+    записывается по фактическому окончанию работы.
+    """
+
+    def __init__(self, queues, poll_interval=1.0):
+        self.queues = queues
+        self.poll_interval = poll_interval
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.executors = {
+            queue: ThreadPoolExecutor(concurrency,
+                                      thread_name_prefix=f'task-{queue}')
+            for queue, concurrency in queues.items()
+        }
+        self.running = {queue: {} for queue in queues}
+        self.stopping = False
+
+    def busy(self, queue):
+        return len(self.running[queue])
+
+    def reap(self, queue):
+        """
+        Запись результатов завершённых задач и продление аренды
+        просроченных.
+        """
+        running = self.running[queue]
+        now = timezone.now()
+        for future, task in list(running.items()):
+            if future.done():
+                del running[future]
+                error = future.exception()
+                finish(task, error)
+                if error:
+                    logger.warning('%s #%s: ошибка %r', task.name, task.pk,
+                                   error)
+                else:
+                    logger.info('%s #%s: готово', task.name, task.pk)
+            elif now > task.locked_until - LEASE_GRACE:
+                if extend_lease(task):
+                    logger.warning(
+                        '%s #%s: выполняется дольше %s сек., аренда продлена',
+                        task.name, task.pk, task.timeout,
+                    )
+                else:
+                    logger.warning('%s #%s: задачу перехватил другой '
+                                   'обработчик', task.name, task.pk)
+
+    def poll(self):
+        """Один проход по очередям; возвращает число взятых задач."""
+        close_old_connections()
+        claimed = 0
+        for queue, concurrency in self.queues.items():
+            self.reap(queue)
+            while self.busy(queue) < concurrency:
+                task = claim(queue, self.name)
+                if task is None:
+                    break
+                future = self.executors[queue].submit(execute, task)
+                self.running[queue][future] = task
+                claimed += 1
+        return claimed
+
+    def run(self, burst=False):
+        """
+        Основной цикл. В режиме burst обработчик завершается, когда
+        очереди опустели.
+        """
+        while not self.stopping:
+            claimed = self.poll()
+            if burst and not claimed and not any(self.running.values()):
+                break
+            if not claimed:
+                time.sleep(self.poll_interval)
+        for queue, running in self.running.items():
+            wait(running)
+            self.reap(queue)
+        for executor in self.executors.values():
+            executor.shutdown(wait=False)
+
+    def stop(self, *args):
+        self.stopping = True
@@ -1,26 +1,31 @@
 from django.contrib import admin
 
+from api.admin_tools import ScalableAdmin, autocomplete_filter
+
 from .models import Follow, User
 
 EMPTY_VALUE = '-пусто-'
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(ScalableAdmin):
     """Отображение и фильтр полей User в админке."""
 
-    list_display = ('id', 'username', 'first_name', 'last_name', 'email',)
+    list_display = ('id', 'username', 'first_name', 'last_name', 'email',
+                    'recipes_count', 'followers_count')
     search_fields = ('username', 'email',)
-    list_filter = ('first_name', 'email',)
+    list_filter = ('is_staff',)
     list_display_links = ('username',)
     empty_value = EMPTY_VALUE
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(ScalableAdmin):
     """Отображение, фильтр, поиск полей Follow в админке."""
 
     list_display = ('user', 'author')
-    list_filter = ('user', 'author')
-    search_fields = ('user', 'author')
+    list_select_related = ('user', 'author')
+    list_filter = (autocomplete_filter('user'), autocomplete_filter('author'))
+    search_fields = ('user__username', 'author__username')
+    autocomplete_fields = ('user', 'author')
     empty_value = EMPTY_VALUE
@@ -38,6 +38,16 @@ class User(AbstractUser):
         'Пароль',
         max_length=PASSWORD_LENGTH,
     )
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -49,6 +59,12 @@ class User(AbstractUser):
                 name='unique_auth'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('-followers_count', '-id'),
+                name='user_followers_count_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.username[:MAXLENGTH]
@@ -80,6 +96,12 @@ class Follow(models.Model):
                 name='unique_subscription'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('user', '-id'),
+                name='follow_user_id_idx',
+            ),
+        ]
 
     def clean(self):
         if self.user == self.author: